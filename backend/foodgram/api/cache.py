@@ -0,0 +1,102 @@
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+from recipes.images import variant_urls
+from .metrics import registry
+
+LOCAL_CACHE_BACKENDS = (LocMemCache, DummyCache)
+
+
+def is_shared_cache():
+    """Общий ли кэш default для всех процессов: версии таблиц в кэше
+    процесса другие воркеры не видят.
+    """
+    return not isinstance(caches['default'], LOCAL_CACHE_BACKENDS)
+
+
+def reference_cache_enabled():
+    return settings.REFERENCE_CACHE and is_shared_cache()
+
+
+def recipe_feed_cache_enabled():
+    return settings.RECIPE_FEED_CACHE and is_shared_cache()
+
+
+class RecipeFeedCache:
+    """Общая для всех пользователей часть сериализованных рецептов.
+
+    Запись хранится по id рецепта вместе с updated_at и считается
+    устаревшей, если рецепт изменился. Поля, зависящие от пользователя,
+    и абсолютный адрес картинки подставляются при каждом запросе.
+
+    Правка тега, ингредиента или автора не меняет updated_at рецепта,
+    поэтому такие записи удаляются явно, и это должно быть видно всем
+    процессам: кэш включается RECIPE_FEED_CACHE и только при общем кэше.
+    """
+    user_fields = ('is_favorited', 'is_in_shopping_cart')
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+
+    @staticmethod
+    def key(pk):
+        return f'recipe-body:{pk}'
+
+    def get_many(self, recipes):
+        if not recipe_feed_cache_enabled():
+            return {}
+        entries = cache.get_many([self.key(recipe.pk) for recipe in recipes])
+        bodies = {}
+        for recipe in recipes:
+            entry = entries.get(self.key(recipe.pk))
+            if entry is not None and entry[0] == recipe.updated_at:
+                bodies[recipe.pk] = entry[1]
+        registry.inc('foodgram_cache_requests_total', len(bodies),
+                     cache='recipe_feed', result='hit')
+        registry.inc('foodgram_cache_requests_total',
+                     len(recipes) - len(bodies),
+                     cache='recipe_feed', result='miss')
+        return bodies
+
+    def set_many(self, recipes, bodies):
+        if not recipe_feed_cache_enabled():
+            return
+        cache.set_many({
+            self.key(recipe.pk): (recipe.updated_at, bodies[recipe.pk])
+            for recipe in recipes
+        }, self.timeout)
+
+    def delete_many(self, pks):
+        if not recipe_feed_cache_enabled():
+            return
+        cache.delete_many([self.key(pk) for pk in pks])
+
+    def make_shared(self, recipe, data):
+        body = {
+            name: value for name, value in data.items()
+            if name not in self.user_fields
+        }
+        body['author'] = {
+            name: value for name, value in data['author'].items()
+            if name != 'is_subscribed'
+        }
+        body['image'] = recipe.image.url if recipe.image else None
+        body['image_variants'] = variant_urls(recipe)
+        return body
+
+    def overlay(self, body, fields, request, is_subscribed, **flags):
+        data = dict(body, **flags)
+        data['author'] = dict(body['author'], is_subscribed=is_subscribed)
+        if body['image'] is not None:
+            data['image'] = request.build_absolute_uri(body['image'])
+        if body['image_variants'] is not None:
+            data['image_variants'] = {
+                variant: request.build_absolute_uri(url)
+                for variant, url in body['image_variants'].items()
+            }
+        return {name: data[name] for name in fields}
+
+
+recipe_feed_cache = RecipeFeedCache(settings.RECIPE_FEED_CACHE_TIMEOUT)
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+from .cache import is_shared_cache
+
+
+@register()
+def check_reference_cache(app_configs, **kwargs):
+    if settings.REFERENCE_CACHE and not is_shared_cache():
+        return [Error(
+            'REFERENCE_CACHE требует общего для всех процессов кэша',
+            hint='Укажите CACHE_BACKEND, например memcached или redis, '
+                 'или выключите REFERENCE_CACHE.',
+            id='api.E001',
+        )]
+    return []
+
+
+@register()
+def check_recipe_feed_cache(app_configs, **kwargs):
+    if settings.RECIPE_FEED_CACHE and not is_shared_cache():
+        return [Error(
+            'RECIPE_FEED_CACHE требует общего для всех процессов кэша',
+            hint='Укажите CACHE_BACKEND, например memcached или redis, '
+                 'или выключите RECIPE_FEED_CACHE.',
+            id='api.E002',
+        )]
+    return []
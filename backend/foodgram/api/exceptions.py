@@ -0,0 +1,6 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.settings import api_settings
+
+
+def toggle_error(message):
+    return ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [message]})
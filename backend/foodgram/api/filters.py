@@ -1,6 +1,8 @@
 import django_filters
+from django.db.models import Exists, F, OuterRef
+from rest_framework.filters import OrderingFilter
 
-from recipes.models import Recipes, Tag
+from recipes.models import Favorite, ListToBuy, Recipes, Tag
 
 STATUS_CHOICES = (
     (1, '1'),
@@ -9,6 +11,9 @@ STATUS_CHOICES = (
 
 
 class RecipesFilter(django_filters.FilterSet):
+    """Фильтры собраны на коррелированных EXISTS, поэтому не размножают
+    строки рецептов и не требуют DISTINCT.
+    """
     is_favorited = django_filters.ChoiceFilter(
         method='filter_is_favorited',
         choices=STATUS_CHOICES
@@ -20,25 +25,60 @@ class RecipesFilter(django_filters.FilterSet):
     tags = django_filters.ModelMultipleChoiceFilter(
         field_name='tags__slug',
         to_field_name='slug',
-        queryset=Tag.objects.all()
+        queryset=Tag.objects.all(),
+        method='filter_tags'
     )
 
-    def filter_is_favorited(self, queryset, name, value):
-        if not self.request.user.is_authenticated:
+    def filter_user_relation(self, queryset, name, model, value):
+        user = self.request.user
+        if not user.is_authenticated:
             return queryset
-        recipes = self.request.user.favorite.values_list('recipe', flat=True)
-        if value == '1':
-            return queryset.filter(id__in=recipes)
-        return queryset.exclude(id__in=recipes)
+        if name not in queryset.query.annotations:
+            queryset = queryset.annotate(**{name: Exists(model.objects.filter(
+                recipe=OuterRef('pk'), user=user
+            ))})
+        return queryset.filter(**{name: value == '1'})
+
+    def filter_is_favorited(self, queryset, name, value):
+        return self.filter_user_relation(queryset, name, Favorite, value)
 
     def filter_is_in_shopping_cart(self, queryset, name, value):
-        if not self.request.user.is_authenticated:
+        return self.filter_user_relation(queryset, name, ListToBuy, value)
+
+    def filter_tags(self, queryset, name, value):
+        if not value:
             return queryset
-        recipes = self.request.user.listtobuy.values_list('recipe', flat=True)
-        if value == '1':
-            return queryset.filter(id__in=recipes)
-        return queryset.exclude(id__in=recipes)
+        return queryset.annotate(has_tags=Exists(
+            Recipes.tags.through.objects.filter(
+                recipes=OuterRef('pk'), tag__in=value
+            )
+        )).filter(has_tags=True)
 
     class Meta:
         model = Recipes
         fields = ('is_favorited', 'is_in_shopping_cart', 'author', 'tags')
+
+
+class RecipesOrderingFilter(OrderingFilter):
+    """Добавляет id последним ключом сортировки в направлении первого
+    ключа, чтобы порядок был однозначным и годился для пагинации курсором.
+
+    ordering=popular и ordering=trending читают предрасчитанные оценки
+    из RecipeRank (команда update_recipe_ranks) через индекс по оценке.
+    """
+    rankings = ('popular', 'trending')
+
+    def filter_queryset(self, request, queryset, view):
+        ranking = request.query_params.get(self.ordering_param)
+        if ranking not in self.rankings:
+            return super().filter_queryset(request, queryset, view)
+        return queryset.filter(rank__isnull=False).annotate(
+            **{ranking: F(f'rank__{ranking}')}
+        ).order_by(f'-{ranking}', '-id')
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not ordering or ordering[-1].lstrip('-') in ('id', 'pk'):
+            return ordering
+        direction = '-' if ordering[0].startswith('-') else ''
+        return list(ordering) + [f'{direction}id']
@@ -0,0 +1,531 @@
+import json
+import os
+import random
+import time
+import tracemalloc
+from itertools import count
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLResolver, get_resolver, reverse
+from rest_framework.test import APIClient
+
+from api.management.benchmarking import percentile
+from recipes import counters, ranking, shopping_cart
+from recipes.models import (
+    Favorite, Ingredient, IngredientRecipe, ListToBuy, Recipes, Subscript,
+    Tag, User
+)
+
+DEFAULT_PATH = os.path.join(
+    settings.BASE_DIR, '..', '..', 'data', 'ingredients.json'
+)
+DEFAULT_BASELINE = os.path.join(
+    settings.BASE_DIR, 'api', 'benchmark_baseline.json'
+)
+PASSWORD = 'benchmark-password'
+TAGS = 5
+BATCH_IDS = 10
+BUDGETS = ('queries', 'p95_ms', 'peak_kb')
+CASES = []
+
+
+def case(route, method='get'):
+    def register(prepare):
+        CASES.append((prepare.__name__, route, method, prepare))
+        return prepare
+    return register
+
+
+def api_routes(patterns=None):
+    if patterns is None:
+        patterns = get_resolver('api.urls').url_patterns
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from api_routes(pattern.url_patterns)
+        elif pattern.name:
+            yield pattern.name
+
+
+@case('api-root')
+def api_root(data):
+    return reverse('api-root'), None
+
+
+@case('tag-list')
+def tags_list(data):
+    return reverse('tag-list'), None
+
+
+@case('tag-detail')
+def tags_detail(data):
+    return reverse('tag-detail', args=[data.tag_ids[0]]), None
+
+
+@case('ingredient-list')
+def ingredients_list(data):
+    return reverse('ingredient-list'), None
+
+
+@case('ingredient-list')
+def ingredients_search(data):
+    return reverse('ingredient-list'), {'name': 'сах'}
+
+
+@case('ingredient-detail')
+def ingredients_detail(data):
+    return reverse('ingredient-detail', args=[data.ingredient_ids[0]]), None
+
+
+@case('recipes-list')
+def recipes_list(data):
+    return reverse('recipes-list'), {'limit': 6}
+
+
+@case('recipes-list')
+def recipes_list_filtered(data):
+    return reverse('recipes-list'), {
+        'limit': 6, 'is_favorited': 1, 'tags': data.tag_slugs[:2]
+    }
+
+
+@case('recipes-list')
+def recipes_list_popular(data):
+    return reverse('recipes-list'), {'limit': 6, 'ordering': 'popular'}
+
+
+@case('recipes-list')
+def recipes_list_cursor(data):
+    return reverse('recipes-list'), {'limit': 6, 'cursor': ''}
+
+
+@case('recipes-detail')
+def recipes_detail(data):
+    return reverse('recipes-detail', args=[data.recipe_ids[0]]), None
+
+
+def recipe_body(data):
+    return {
+        'name': f'Рецепт {next(data.counter)}',
+        'text': 'Описание',
+        'cooking_time': random.randint(1, 120),
+        'tags': data.tag_ids[:2],
+        'ingredients': [
+            {'id': pk, 'amount': random.randint(1, 500)}
+            for pk in data.ingredient_ids[:5]
+        ],
+    }
+
+
+@case('recipes-list', 'post')
+def recipes_create(data):
+    return reverse('recipes-list'), recipe_body(data)
+
+
+@case('recipes-detail', 'patch')
+def recipes_update(data):
+    return reverse('recipes-detail', args=[data.own_recipe_id]), (
+        recipe_body(data)
+    )
+
+
+@case('recipes-detail', 'delete')
+def recipes_delete(data):
+    recipe = Recipes.objects.create(
+        author=data.user, name='Удаляемый рецепт', cooking_time=1
+    )
+    IngredientRecipe.objects.create(
+        recipe=recipe, ingredient_id=data.ingredient_ids[0], amount=1
+    )
+    return reverse('recipes-detail', args=[recipe.pk]), None
+
+
+def toggle(data, route, args, method, body=None):
+    url = reverse(route, args=args)
+    getattr(data.client, method)(url, body, format='json')
+    return url, body
+
+
+@case('recipes-favorite', 'post')
+def favorite_add(data):
+    return toggle(data, 'recipes-favorite', [data.recipe_ids[0]], 'delete')
+
+
+@case('recipes-favorite', 'delete')
+def favorite_remove(data):
+    return toggle(data, 'recipes-favorite', [data.recipe_ids[0]], 'post')
+
+
+@case('recipes-favorite-batch', 'post')
+def favorite_batch_add(data):
+    return toggle(data, 'recipes-favorite-batch', [], 'delete',
+                  {'ids': data.recipe_ids[:BATCH_IDS]})
+
+
+@case('recipes-favorite-batch', 'delete')
+def favorite_batch_remove(data):
+    return toggle(data, 'recipes-favorite-batch', [], 'post',
+                  {'ids': data.recipe_ids[:BATCH_IDS]})
+
+
+@case('recipes-shopping-cart', 'post')
+def shopping_cart_add(data):
+    return toggle(data, 'recipes-shopping-cart', [data.recipe_ids[0]],
+                  'delete')
+
+
+@case('recipes-shopping-cart', 'delete')
+def shopping_cart_remove(data):
+    return toggle(data, 'recipes-shopping-cart', [data.recipe_ids[0]],
+                  'post')
+
+
+@case('recipes-shopping-cart-batch', 'post')
+def shopping_cart_batch_add(data):
+    return toggle(data, 'recipes-shopping-cart-batch', [], 'delete',
+                  {'ids': data.recipe_ids[:BATCH_IDS]})
+
+
+@case('recipes-shopping-cart-batch', 'delete')
+def shopping_cart_batch_remove(data):
+    return toggle(data, 'recipes-shopping-cart-batch', [], 'post',
+                  {'ids': data.recipe_ids[:BATCH_IDS]})
+
+
+@case('recipes-shopping-cart-total')
+def shopping_cart_total(data):
+    return reverse('recipes-shopping-cart-total'), None
+
+
+@case('recipes-download-shopping-cart')
+def download_shopping_cart(data):
+    return reverse('recipes-download-shopping-cart'), None
+
+
+@case('user-list')
+def users_list(data):
+    return reverse('user-list'), {'limit': 6}
+
+
+@case('user-list', 'post')
+def users_create(data):
+    number = next(data.counter)
+    return reverse('user-list'), {
+        'email': f'new{number}@example.com',
+        'username': f'new{number}',
+        'first_name': 'Имя',
+        'last_name': 'Фамилия',
+        'password': PASSWORD,
+    }
+
+
+@case('user-detail')
+def users_detail(data):
+    return reverse('user-detail', args=[data.author_id]), None
+
+
+@case('user-me')
+def users_me(data):
+    return reverse('user-me'), None
+
+
+@case('user-set-password', 'post')
+def users_set_password(data):
+    return reverse('user-set-password'), {
+        'current_password': PASSWORD, 'new_password': PASSWORD
+    }
+
+
+@case('user-subscriptions')
+def users_subscriptions(data):
+    return reverse('user-subscriptions'), {'limit': 6, 'recipes_limit': 3}
+
+
+@case('user-subscribe', 'post')
+def subscribe(data):
+    return toggle(data, 'user-subscribe', [data.author_id], 'delete')
+
+
+@case('user-subscribe', 'delete')
+def unsubscribe(data):
+    return toggle(data, 'user-subscribe', [data.author_id], 'post')
+
+
+@case('login', 'post')
+def login(data):
+    return reverse('login'), {
+        'email': data.user.email, 'password': PASSWORD
+    }
+
+
+@case('metrics')
+def metrics(data):
+    return reverse('metrics'), None
+
+
+@case('logout', 'post')
+def logout(data):
+    return reverse('logout'), None
+
+
+class Command(BaseCommand):
+    help = ('Прогоняет все маршруты API на синтетических данных и замеряет '
+            'число SQL-запросов, время ответа и пик выделенной памяти')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default=DEFAULT_PATH)
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--recipes', type=int, default=500)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--favorites', type=int, default=20,
+                            help='Избранных рецептов на пользователя')
+        parser.add_argument('--carts', type=int, default=5,
+                            help='Рецептов в списке покупок на пользователя')
+        parser.add_argument('--subscriptions', type=int, default=5,
+                            help='Подписок на пользователя')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--cases', nargs='+',
+                            help='Запустить только перечисленные сценарии')
+        parser.add_argument('--output', help='Куда записать отчёт в JSON')
+        parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+        parser.add_argument(
+            '--save-baseline', action='store_true',
+            help='Записать результаты как новые бюджеты вместо проверки'
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=0.5,
+            help='Допустимое превышение бюджетов времени и памяти, доля'
+        )
+        parser.add_argument(
+            '--keepdb', action='store_true',
+            help='Не удалять тестовую базу после прогона'
+        )
+
+    def handle(self, *args, **options):
+        missing = set(api_routes()) - {route for _, route, _, _ in CASES}
+        if missing:
+            raise CommandError(
+                f'Нет сценариев для маршрутов: {", ".join(sorted(missing))}'
+            )
+        creation = connection.creation
+        old_name = connection.settings_dict['NAME']
+        creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False,
+            keepdb=options['keepdb']
+        )
+        try:
+            with override_settings(
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+                CACHES={'default': {
+                    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                    'LOCATION': 'benchmark-api',
+                }},
+                RECIPE_IMAGE_WORKERS=0,
+                METRICS=True,
+                METRICS_DIR=''
+            ):
+                report = self.run(options)
+        finally:
+            creation.destroy_test_db(old_name, 0, options['keepdb'])
+        self.write_report(report, options)
+
+    def run(self, options):
+        random.seed(options['seed'])
+        started = time.perf_counter()
+        data = self.seed(options)
+        self.stdout.write(
+            f'Данные подготовлены за {time.perf_counter() - started:.1f} с'
+        )
+        report = {'dataset': {
+            key: options[key] for key in (
+                'users', 'recipes', 'ingredients_per_recipe', 'favorites',
+                'carts', 'subscriptions', 'repeat', 'seed'
+            )
+        }, 'vendor': connection.vendor, 'cases': {}}
+        for name, route, method, prepare in CASES:
+            if options['cases'] and name not in options['cases']:
+                continue
+            result = self.measure(data, method, prepare, options)
+            report['cases'][name] = result
+            self.stdout.write(
+                f'{name:28} {method.upper():6} {result["status"]} '
+                f'queries={result["queries"]:<3} '
+                f'p50={result["p50_ms"]:.2f} ms '
+                f'p95={result["p95_ms"]:.2f} ms '
+                f'peak={result["peak_kb"]:.0f} KB'
+            )
+        return report
+
+    def request(self, data, method, prepare):
+        url, body = prepare(data)
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = getattr(data.client, method)(url, body, format='json')
+            # Тело потокового ответа строится и читает БД при итерации.
+            if response.streaming:
+                b''.join(response.streaming_content)
+            elapsed = time.perf_counter() - started
+        if response.status_code >= 400:
+            raise CommandError(
+                f'{method.upper()} {url}: {response.status_code} '
+                f'{getattr(response, "data", response.content)}'
+            )
+        return response.status_code, len(queries), elapsed
+
+    def measure(self, data, method, prepare, options):
+        for _ in range(options['warmup']):
+            self.request(data, method, prepare)
+        timings, queries = [], 0
+        for _ in range(options['repeat']):
+            status, executed, elapsed = self.request(data, method, prepare)
+            timings.append(elapsed)
+            queries = max(queries, executed)
+        tracemalloc.start()
+        try:
+            self.request(data, method, prepare)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return {
+            'status': status,
+            'queries': queries,
+            'p50_ms': round(percentile(timings, 0.5) * 1000, 3),
+            'p95_ms': round(percentile(timings, 0.95) * 1000, 3),
+            'peak_kb': round(peak / 1024, 1),
+        }
+
+    def seed(self, options):
+        with open(options['path'], encoding='utf-8') as file:
+            Ingredient.objects.bulk_create(
+                (Ingredient(name=item['name'],
+                            measurement_unit=item['measurement_unit'])
+                 for item in json.load(file)),
+                ignore_conflicts=True
+            )
+        Tag.objects.bulk_create(
+            Tag(name=f'Тег {number}', color=f'#{number:06X}',
+                slug=f'tag-{number}')
+            for number in range(TAGS)
+        )
+        password = make_password(PASSWORD)
+        User.objects.bulk_create(
+            User(username=f'user{number}', email=f'user{number}@example.com',
+                 first_name='Имя', last_name='Фамилия', password=password)
+            for number in range(options['users'])
+        )
+        user_ids = list(User.objects.order_by('pk').values_list(
+            'pk', flat=True
+        ))
+        Recipes.objects.bulk_create(
+            Recipes(author_id=user_ids[number % len(user_ids)],
+                    name=f'Рецепт {number}', text='Описание',
+                    cooking_time=random.randint(1, 120))
+            for number in range(options['recipes'])
+        )
+        data = SimpleNamespace(
+            user=User.objects.get(pk=user_ids[0]),
+            author_id=user_ids[1],
+            tag_ids=list(Tag.objects.values_list('pk', flat=True)),
+            tag_slugs=list(Tag.objects.values_list('slug', flat=True)),
+            ingredient_ids=list(Ingredient.objects.values_list(
+                'pk', flat=True
+            )),
+            recipe_ids=list(Recipes.objects.order_by('pk').values_list(
+                'pk', flat=True
+            )),
+            counter=count(),
+            client=APIClient(),
+        )
+        data.own_recipe_id = data.recipe_ids[0]
+        self.seed_relations(data, user_ids, options)
+        data.client.force_authenticate(data.user)
+        return data
+
+    def seed_relations(self, data, user_ids, options):
+        recipes_tags = Recipes.tags.through
+        recipes_tags.objects.bulk_create(
+            recipes_tags(recipes_id=pk, tag_id=tag_id)
+            for pk in data.recipe_ids
+            for tag_id in random.sample(data.tag_ids, 2)
+        )
+        per_recipe = options['ingredients_per_recipe']
+        IngredientRecipe.objects.bulk_create(
+            IngredientRecipe(recipe_id=pk, ingredient_id=ingredient_id,
+                             amount=random.randint(1, 500))
+            for pk in data.recipe_ids
+            for ingredient_id in random.sample(data.ingredient_ids, per_recipe)
+        )
+        for model, per_user in (
+            (Favorite, options['favorites']), (ListToBuy, options['carts'])
+        ):
+            model.objects.bulk_create(
+                model(user_id=user_id, recipe_id=pk)
+                for user_id in user_ids
+                for pk in random.sample(data.recipe_ids, per_user)
+            )
+        Subscript.objects.bulk_create(
+            Subscript(user_id=user_id, author_id=author_id)
+            for user_id in user_ids
+            for author_id in random.sample(
+                [pk for pk in user_ids if pk != user_id],
+                options['subscriptions']
+            )
+        )
+        counters.recount()
+        shopping_cart.rebuild()
+        ranking.update_ranks(full=True)
+
+    def write_report(self, report, options):
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+        if options['save_baseline']:
+            with open(options['baseline'], 'w', encoding='utf-8') as file:
+                json.dump({'vendor': connection.vendor, 'cases': {
+                    name: {budget: result[budget] for budget in BUDGETS}
+                    for name, result in report['cases'].items()
+                }}, file, ensure_ascii=False, indent=2, sort_keys=True)
+                file.write('\n')
+            return
+        if not os.path.exists(options['baseline']):
+            return
+        with open(options['baseline'], encoding='utf-8') as file:
+            baseline = json.load(file)
+        if baseline.get('vendor', connection.vendor) != connection.vendor:
+            raise CommandError(
+                f'Базовая линия записана на {baseline["vendor"]}, а прогон '
+                f'идёт на {connection.vendor}: число запросов не сравнить'
+            )
+        baseline = baseline['cases']
+        failed = []
+        for name, budgets in sorted(baseline.items()):
+            if name not in report['cases']:
+                continue
+            for budget, limit in sorted(budgets.items()):
+                error = self.check_budget(
+                    budget, report['cases'][name][budget], limit,
+                    options['tolerance']
+                )
+                if error:
+                    failed.append(f'{name}: {budget} {error}')
+        if failed:
+            raise CommandError(
+                'Бюджеты не соблюдены:\n' + '\n'.join(failed)
+            )
+        self.stdout.write(self.style.SUCCESS('Бюджеты соблюдены'))
+
+    def check_budget(self, budget, value, limit, tolerance):
+        """Число запросов сверяется точно: и рост, и снижение означают,
+        что базовую линию нужно обновить вместе с изменением.
+        """
+        if budget == 'queries':
+            return None if value == limit else f'{value} != {limit}'
+        if value > limit * (1 + tolerance):
+            return f'{value} > {limit}'
+        return None
@@ -0,0 +1,83 @@
+import time
+from urllib.parse import urlsplit
+from wsgiref.util import setup_testing_defaults
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+
+from api.management.benchmarking import percentile
+from api.metrics import registry
+
+CREATED = 'foodgram_db_connections_created_total'
+
+
+def start_response(status, headers, exc_info=None):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Прогоняет запросы через полный цикл WSGI с разными CONN_MAX_AGE '
+            'и показывает, сколько соединений с БД открыто и во что '
+            'обходится их установка')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/recipes/?limit=6')
+        parser.add_argument('--requests', type=int, default=300)
+        parser.add_argument(
+            '--max-ages', type=int, nargs='+', default=[0, 60],
+            help='Значения CONN_MAX_AGE для сравнения'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{connection.settings_dict["ENGINE"]}: установка соединения '
+            f'p50={self.measure_connect(options["requests"]) * 1000:.2f} ms'
+        )
+        handler = WSGIHandler()
+        original = connection.settings_dict['CONN_MAX_AGE']
+        try:
+            for max_age in options['max_ages']:
+                connection.close()
+                connection.settings_dict['CONN_MAX_AGE'] = max_age
+                with override_settings(METRICS=True, METRICS_DIR=''):
+                    self.run(handler, max_age, options)
+        finally:
+            connection.close()
+            connection.settings_dict['CONN_MAX_AGE'] = original
+
+    def measure_connect(self, count):
+        timings = []
+        for _ in range(count):
+            connection.close()
+            started = time.perf_counter()
+            connection.connect()
+            connection.cursor().execute('SELECT 1')
+            timings.append(time.perf_counter() - started)
+        connection.close()
+        return percentile(timings, 0.5)
+
+    def request(self, handler, path):
+        url = urlsplit(path)
+        environ = {'PATH_INFO': url.path, 'QUERY_STRING': url.query}
+        setup_testing_defaults(environ)
+        started = time.perf_counter()
+        response = handler(environ, start_response)
+        b''.join(response)
+        response.close()
+        return response.status_code, time.perf_counter() - started
+
+    def run(self, handler, max_age, options):
+        created = registry.get(CREATED, alias=connection.alias)
+        timings = []
+        for _ in range(options['requests']):
+            status, elapsed = self.request(handler, options['path'])
+            timings.append(elapsed)
+        created = registry.get(CREATED, alias=connection.alias) - created
+        self.stdout.write(
+            f'CONN_MAX_AGE={max_age:<5} {status} '
+            f'новых соединений={created:<5} '
+            f'p50={percentile(timings, 0.5) * 1000:.2f} ms '
+            f'p95={percentile(timings, 0.95) * 1000:.2f} ms'
+        )
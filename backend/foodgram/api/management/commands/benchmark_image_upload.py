@@ -0,0 +1,136 @@
+import base64
+import io
+import json
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+import tracemalloc
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from django.test import RequestFactory, override_settings
+from PIL import Image
+from rest_framework.test import force_authenticate
+
+from api.views import RecipesViewSet
+from recipes.models import Ingredient, Tag, User
+
+MEGABYTE = 1024 * 1024
+
+
+def make_png(size):
+    side = int((size / 3) ** 0.5)
+    buffer = io.BytesIO()
+    Image.frombytes('RGB', (side, side), os.urandom(side * side * 3)).save(
+        buffer, 'PNG', compress_level=0
+    )
+    return buffer.getvalue()
+
+
+def current_rss():
+    with open('/proc/self/statm') as file:
+        pages = int(file.read().split()[1])
+    return pages * os.sysconf('SC_PAGE_SIZE')
+
+
+def peak_rss():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def make_request(factory, kind, image, tag, ingredient):
+    data = {
+        'name': 'benchmark',
+        'text': 'benchmark',
+        'cooking_time': 1,
+    }
+    ingredients = [{'id': ingredient.pk, 'amount': 1}]
+    if kind == 'json':
+        data.update(
+            tags=[tag.pk],
+            ingredients=ingredients,
+            image='data:image/png;base64,'
+                  + base64.b64encode(image).decode()
+        )
+        return factory.post(
+            '/api/recipes/', json.dumps(data),
+            content_type='application/json'
+        )
+    data.update(
+        tags=[tag.pk],
+        ingredients=json.dumps(ingredients),
+        image=SimpleUploadedFile('image.png', image, 'image/png')
+    )
+    return factory.post('/api/recipes/', data)
+
+
+def run_case(kind, size, repeat, results):
+    view = RecipesViewSet.as_view({'post': 'create'})
+    factory = RequestFactory()
+    image = make_png(size * MEGABYTE)
+    timings, peak, traced = [], 0, 0
+    with tempfile.TemporaryDirectory() as media_root, override_settings(
+        MEDIA_ROOT=media_root
+    ), transaction.atomic():
+        user = User.objects.create(username='benchmark-image-upload')
+        tag = Tag.objects.create(
+            name='benchmark', color='#000000', slug='benchmark-image-upload'
+        )
+        ingredient = Ingredient.objects.create(
+            name='benchmark-image-upload', measurement_unit='г'
+        )
+        for attempt in range(repeat + 1):
+            request = make_request(factory, kind, image, tag, ingredient)
+            force_authenticate(request, user)
+            if attempt == repeat:
+                tracemalloc.start()
+            before = max(current_rss(), peak_rss())
+            started = time.perf_counter()
+            response = view(request)
+            elapsed = time.perf_counter() - started
+            if response.status_code != 201:
+                raise RuntimeError(response.data)
+            if attempt == repeat:
+                traced = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            else:
+                timings.append(elapsed)
+                peak = max(peak, peak_rss() - before)
+        transaction.set_rollback(True)
+    results.put((len(image), timings, peak, traced))
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает загрузку картинки рецепта строкой base64 в JSON '
+            'и файлом в multipart/form-data')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[1, 5, 10],
+            help='Размеры картинок в МБ'
+        )
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        context = multiprocessing.get_context('fork')
+        for size in options['sizes']:
+            for kind in ('json', 'multipart'):
+                connections.close_all()
+                results = context.Queue()
+                process = context.Process(
+                    target=run_case,
+                    args=(kind, size, options['repeat'], results)
+                )
+                process.start()
+                image_size, timings, peak, traced = results.get()
+                process.join()
+                timings.sort()
+                self.stdout.write(
+                    f'{kind:9} {image_size / MEGABYTE:5.1f} МБ: '
+                    f'p50={timings[len(timings) // 2] * 1000:.1f} ms '
+                    f'max={timings[-1] * 1000:.1f} ms '
+                    f'прирост пика RSS={peak / MEGABYTE:.1f} МБ '
+                    f'пик tracemalloc={traced / MEGABYTE:.1f} МБ'
+                )
@@ -0,0 +1,98 @@
+import json
+import os
+import random
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from rest_framework.request import Request
+
+from api.management.benchmarking import percentile
+from api.search import IngredientIndex, IngredientSearchFilter
+from api.views import IngredientViewSet
+from recipes.models import Ingredient
+
+DEFAULT_PATH = os.path.join(
+    settings.BASE_DIR, '..', '..', 'data', 'ingredients.json'
+)
+
+
+class Command(BaseCommand):
+    help = 'Замеряет время поиска ингредиентов по префиксу'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default=DEFAULT_PATH)
+        parser.add_argument(
+            '--scale', type=int, default=1,
+            help='Во сколько раз размножить каталог'
+        )
+        parser.add_argument('--queries', type=int, default=2000)
+        parser.add_argument(
+            '--database', action='store_true',
+            help='Искать через IngredientSearchFilter по текущей БД'
+        )
+
+    def load_names(self, path, scale):
+        with open(path, encoding='utf-8') as file:
+            catalogue = json.load(file)
+        pk = 0
+        for copy in range(scale):
+            suffix = f' {copy}' if copy else ''
+            for item in catalogue:
+                pk += 1
+                yield pk, item['name'] + suffix, item['measurement_unit']
+
+    def make_queries(self, names, count):
+        random.seed(0)
+        queries = []
+        for _ in range(count):
+            name = random.choice(names)
+            queries.append(name[:random.randint(1, min(len(name), 6))])
+        return queries
+
+    def report(self, title, timings, found):
+        self.stdout.write(
+            f'{title}: p50={percentile(timings, 0.5) * 1000:.3f} ms '
+            f'p99={percentile(timings, 0.99) * 1000:.3f} ms '
+            f'max={max(timings) * 1000:.3f} ms '
+            f'avg results={found / len(timings):.1f}'
+        )
+
+    def handle(self, *args, **options):
+        if options['database']:
+            names = list(Ingredient.objects.values_list('name', flat=True))
+            self.bench_database(
+                self.make_queries(names, options['queries'])
+            )
+            return
+        rows = list(self.load_names(options['path'], options['scale']))
+        started = time.perf_counter()
+        index = IngredientIndex(rows)
+        self.stdout.write(
+            f'{len(index)} ингредиентов, индекс построен за '
+            f'{(time.perf_counter() - started) * 1000:.1f} ms'
+        )
+        timings, found = [], 0
+        for query in self.make_queries(
+            [name for _, name, _ in rows], options['queries']
+        ):
+            started = time.perf_counter()
+            found += len(index.search(query))
+            timings.append(time.perf_counter() - started)
+        self.report('IngredientIndex', timings, found)
+
+    def bench_database(self, queries):
+        view = IngredientViewSet(action='list')
+        factory = RequestFactory()
+        timings, found = [], 0
+        for query in queries:
+            view.request = Request(factory.get(
+                '/', {IngredientSearchFilter.search_param: query}
+            ))
+            started = time.perf_counter()
+            found += len(list(view.filter_queryset(
+                Ingredient.objects.all()
+            )))
+            timings.append(time.perf_counter() - started)
+        self.report('IngredientSearchFilter', timings, found)
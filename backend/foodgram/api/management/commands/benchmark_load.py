@@ -0,0 +1,126 @@
+import json
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+from api.management.benchmarking import percentile
+
+DEFAULT_PATHS = (
+    '/api/tags/',
+    '/api/ingredients/?name=са',
+    '/api/recipes/?limit=6',
+    '/api/recipes/?limit=6&page=2',
+    '/api/recipes/{recipe_id}/',
+    '/api/users/me/',
+)
+AUTH_PATHS = ('/api/users/me/',)
+
+
+class Command(BaseCommand):
+    help = ('Нагружает запущенный сервер запросами на чтение и считает '
+            'запросы в секунду и задержки, чтобы сравнивать режимы запуска '
+            '(gunicorn sync и gthread) на одном железе')
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help='Например, http://localhost:8000')
+        parser.add_argument('--paths', nargs='+', default=DEFAULT_PATHS)
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--duration', type=float, default=10,
+                            help='Длительность нагрузки в секундах')
+        parser.add_argument('--token', help='Токен для /api/users/me/')
+        parser.add_argument('--output', help='Куда записать отчёт в JSON')
+
+    def get_paths(self, options):
+        paths = [
+            path for path in options['paths']
+            if options['token'] or path not in AUTH_PATHS
+        ]
+        if any('{recipe_id}' in path for path in paths):
+            response = requests.get(
+                f'{options["url"]}/api/recipes/', params={'limit': 1}
+            )
+            response.raise_for_status()
+            results = response.json()['results']
+            if not results:
+                raise CommandError('На сервере нет рецептов')
+            paths = [
+                path.format(recipe_id=results[0]['id']) for path in paths
+            ]
+        return paths
+
+    def run_client(self, number, url, paths, headers, deadline):
+        session = requests.Session()
+        session.headers.update(headers)
+        timings, errors = defaultdict(list), Counter()
+        while time.perf_counter() < deadline:
+            path = paths[number % len(paths)]
+            number += 1
+            started = time.perf_counter()
+            try:
+                failed = session.get(url + path, timeout=30).status_code >= 400
+            except requests.RequestException:
+                failed = True
+            if failed:
+                errors[path] += 1
+            else:
+                timings[path].append(time.perf_counter() - started)
+        return timings, errors
+
+    def handle(self, *args, **options):
+        url = options['url'].rstrip('/')
+        options['url'] = url
+        paths = self.get_paths(options)
+        headers = {}
+        if options['token']:
+            headers['Authorization'] = f'Token {options["token"]}'
+        concurrency = options['concurrency']
+        started = time.perf_counter()
+        deadline = started + options['duration']
+        timings, errors = defaultdict(list), Counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            for client_timings, client_errors in pool.map(
+                lambda number: self.run_client(
+                    number, url, paths, headers, deadline
+                ),
+                range(concurrency)
+            ):
+                for path, values in client_timings.items():
+                    timings[path].extend(values)
+                errors.update(client_errors)
+        elapsed = time.perf_counter() - started
+        report = {
+            path: self.summarize(timings[path], errors[path], elapsed)
+            for path in paths
+        }
+        report['total'] = self.summarize(
+            [value for values in timings.values() for value in values],
+            sum(errors.values()), elapsed
+        )
+        for path, result in report.items():
+            self.stdout.write(
+                f'{path:32} {result["requests"]:7} запросов '
+                f'{result["errors"]:5} ошибок '
+                f'{result["rps"]:8.1f} rps '
+                f'p50={result["p50_ms"]:.1f} ms '
+                f'p95={result["p95_ms"]:.1f} ms '
+                f'p99={result["p99_ms"]:.1f} ms'
+            )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump({'concurrency': concurrency, 'results': report},
+                          file, ensure_ascii=False, indent=2)
+
+    def summarize(self, timings, errors, elapsed):
+        count = len(timings)
+        timings = sorted(timings) or [0]
+        return {
+            'requests': count,
+            'errors': errors,
+            'rps': round(count / elapsed, 1),
+            'p50_ms': round(percentile(timings, 0.5) * 1000, 1),
+            'p95_ms': round(percentile(timings, 0.95) * 1000, 1),
+            'p99_ms': round(percentile(timings, 0.99) * 1000, 1),
+        }
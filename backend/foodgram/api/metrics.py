@@ -0,0 +1,296 @@
+import atexit
+import fcntl
+import json
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+METRICS = {
+    'foodgram_http_requests_total': (
+        'counter', 'Запросы по представлению, методу и статусу ответа'
+    ),
+    'foodgram_http_request_duration_seconds': (
+        'histogram', 'Время обработки запроса'
+    ),
+    'foodgram_db_queries_total': (
+        'counter', 'SQL-запросы, выполненные при обработке запросов'
+    ),
+    'foodgram_db_query_duration_seconds_total': (
+        'counter', 'Суммарное время SQL-запросов'
+    ),
+    'foodgram_cache_requests_total': (
+        'counter', 'Обращения к кэшам API по результату'
+    ),
+    'foodgram_db_connections_created_total': (
+        'counter', 'Новые соединения с БД'
+    ),
+    'foodgram_db_pool_connections': (
+        'gauge', 'Соединения в пуле по состоянию'
+    ),
+    'foodgram_db_pool_size_max': (
+        'gauge', 'Наибольшее число соединений пула'
+    ),
+    'foodgram_db_pool_wait_seconds_total': (
+        'counter', 'Суммарное ожидание свободного соединения из пула'
+    ),
+}
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+ARCHIVE = 'archive.json'
+ARCHIVE_LOCK = 'archive.lock'
+
+
+def escape(value):
+    return (
+        str(value).replace('\\', r'\\').replace('\n', r'\n')
+        .replace('"', r'\"')
+    )
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(
+        f'{name}="{escape(value)}"' for name, value in labels
+    ) + '}'
+
+
+def is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def read_json(path):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def write_json(path, data):
+    with open(f'{path}.tmp', 'w') as file:
+        json.dump(data, file)
+    os.replace(f'{path}.tmp', path)
+
+
+def snapshot_name(snapshot):
+    return f'{snapshot["pid"]}-{snapshot["started"]}.json'
+
+
+def add(values, key, value):
+    if isinstance(value, list):
+        total = values.setdefault(key, [0] * len(value))
+        for index, item in enumerate(value):
+            total[index] += item
+    else:
+        values[key] = values.get(key, 0) + value
+
+
+class Registry:
+    """Метрики текущего процесса.
+
+    Каждый процесс не чаще раза в METRICS_FLUSH_INTERVAL секунд
+    записывает снимок своих метрик в METRICS_DIR/<pid>-<время запуска>.json,
+    а /api/metrics складывает снимки всех процессов. Снимки завершившихся
+    процессов, в том числе тех, чей pid достался новому процессу,
+    переносятся в archive.json: их счётчики продолжают учитываться,
+    показания gauge — нет. При выключенном METRICS счётчики не копятся
+    и снимки не пишутся.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.values = {}
+        self.collectors = []
+        self.flushed = 0
+        self.pid = self.started = None
+
+    def inc(self, name, value=1, **labels):
+        if not settings.METRICS:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        if not settings.METRICS:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.values.get(key)
+            if histogram is None:
+                histogram = self.values[key] = [0] * (len(BUCKETS) + 2)
+            for index, bound in enumerate(BUCKETS):
+                if value <= bound:
+                    histogram[index] += 1
+            histogram[-2] += 1
+            histogram[-1] += value
+
+    def get(self, name, **labels):
+        with self.lock:
+            return self.values.get((name, tuple(sorted(labels.items()))), 0)
+
+    def collector(self, function):
+        """Регистрирует функцию, которая при снимке возвращает показания
+        gauge в виде [(имя, {метки}, значение), ...].
+        """
+        self.collectors.append(function)
+        return function
+
+    def identity(self):
+        pid = os.getpid()
+        with self.lock:
+            if self.pid != pid:
+                self.pid, self.started = pid, time.time_ns()
+            return {'pid': self.pid, 'started': self.started}
+
+    def snapshot(self):
+        with self.lock:
+            values = [
+                [name, labels, value[:] if isinstance(value, list) else value]
+                for (name, labels), value in self.values.items()
+            ]
+        gauges = [
+            [name, sorted(labels.items()), value]
+            for collect in self.collectors
+            for name, labels, value in collect()
+        ]
+        return dict(self.identity(), values=values, gauges=gauges)
+
+    def flush(self, force=False):
+        directory = settings.METRICS_DIR
+        now = time.monotonic()
+        if not directory or not self.values or (
+            not force and now - self.flushed < settings.METRICS_FLUSH_INTERVAL
+        ):
+            return
+        # Потоки одного процесса пишут один и тот же файл.
+        if not self.flush_lock.acquire(blocking=force):
+            return
+        try:
+            self.flushed = now
+            snapshot = self.snapshot()
+            os.makedirs(directory, exist_ok=True)
+            write_json(os.path.join(directory, snapshot_name(snapshot)),
+                       snapshot)
+        finally:
+            self.flush_lock.release()
+
+    def read_snapshots(self):
+        own = self.snapshot()
+        yield own
+        directory = settings.METRICS_DIR
+        if not directory or not os.path.isdir(directory):
+            return
+        with open(os.path.join(directory, ARCHIVE_LOCK), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            live, dead = self.split_snapshots(directory, own)
+            yield from live
+            yield self.archive(directory, dead)
+
+    def split_snapshots(self, directory, own):
+        """Делит снимки других процессов на живые и завершившиеся.
+
+        Из нескольких снимков с одним pid живым может быть только самый
+        поздний: остальные оставили процессы, чей pid уже занят.
+        """
+        snapshots = []
+        for name in os.listdir(directory):
+            if not name.endswith('.json') or name in (
+                ARCHIVE, snapshot_name(own)
+            ):
+                continue
+            snapshot = read_json(os.path.join(directory, name))
+            if snapshot is not None:
+                snapshots.append((name, snapshot))
+        latest = {own['pid']: own['started']}
+        for _, snapshot in snapshots:
+            pid, started = snapshot['pid'], snapshot.get('started', 0)
+            latest[pid] = max(latest.get(pid, started), started)
+        live, dead = [], []
+        for name, snapshot in snapshots:
+            pid = snapshot['pid']
+            if snapshot.get('started', 0) == latest[pid] and is_alive(pid):
+                live.append(snapshot)
+            else:
+                dead.append((name, snapshot))
+        return live, dead
+
+    def archive(self, directory, dead):
+        path = os.path.join(directory, ARCHIVE)
+        archive = read_json(path) or {'values': []}
+        if not dead:
+            return archive
+        values = {}
+        for snapshot in [archive] + [snapshot for _, snapshot in dead]:
+            for name, labels, value in snapshot['values']:
+                add(values, (name, tuple(map(tuple, labels))), value)
+        archive = {'values': [
+            [name, labels, value] for (name, labels), value in values.items()
+        ]}
+        write_json(path, archive)
+        for name, _ in dead:
+            os.remove(os.path.join(directory, name))
+        return archive
+
+    def collect(self):
+        values = {}
+        for snapshot in self.read_snapshots():
+            for name, labels, value in (
+                snapshot['values'] + snapshot.get('gauges', [])
+            ):
+                add(values, (name, tuple(map(tuple, labels))), value)
+        return values
+
+    def render(self):
+        values = self.collect()
+        lines = []
+        for metric, (kind, description) in METRICS.items():
+            lines.append(f'# HELP {metric} {description}')
+            lines.append(f'# TYPE {metric} {kind}')
+            for (name, labels), value in sorted(values.items()):
+                if name != metric:
+                    continue
+                if kind == 'histogram':
+                    lines.extend(self.render_histogram(name, labels, value))
+                else:
+                    lines.append(f'{name}{format_labels(labels)} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def render_histogram(self, name, labels, value):
+        for bound, count in zip(BUCKETS + ('+Inf',), value[:-1]):
+            yield (
+                f'{name}_bucket{format_labels(labels + (("le", bound),))} '
+                f'{count}'
+            )
+        yield f'{name}_sum{format_labels(labels)} {value[-1]}'
+        yield f'{name}_count{format_labels(labels)} {value[-2]}'
+
+
+registry = Registry()
+
+
+@registry.collector
+def db_pool_gauges():
+    return [
+        gauge for connection in connections.all()
+        for gauge in getattr(connection, 'pool_gauges', list)()
+    ]
+
+
+@atexit.register
+def flush_at_exit():
+    # Команды manage.py, тесты и shell при выключенных метриках не должны
+    # оставлять снимки в METRICS_DIR.
+    if settings.METRICS:
+        registry.flush(force=True)
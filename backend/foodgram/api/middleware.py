@@ -0,0 +1,190 @@
+import json
+import logging
+import re
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+PLACEHOLDER_LIST = re.compile(r'%s(?:\s*,\s*%s)+')
+SHAPE_LENGTH = 300
+
+
+def query_shape(sql):
+    return PLACEHOLDER_LIST.sub('%s, ...', sql)
+
+
+class QueryTimer:
+    """Обёртка для connection.execute_wrapper: считает запросы, их общее
+    время и сколько раз встретился каждый текст SQL.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.statements[sql] += 1
+
+    def repeated(self, threshold):
+        shapes = Counter()
+        for sql, executed in self.statements.items():
+            shapes[query_shape(sql)] += executed
+        return [
+            {'sql': shape[:SHAPE_LENGTH], 'count': executed}
+            for shape, executed in shapes.most_common()
+            if executed >= threshold
+        ]
+
+
+def net_duration(start, finish):
+    return (finish[0] - start[0]) - (finish[1] - start[1])
+
+
+class RequestTiming:
+    """Отметки (время, время SQL к этому моменту) по фазам запроса."""
+
+    def __init__(self):
+        self.queries = QueryTimer()
+        self.started = self.mark()
+        self.view_started = self.view_finished = self.render_finished = None
+
+    def mark(self):
+        return time.perf_counter(), self.queries.duration
+
+    def phases(self):
+        finished = self.mark()
+        phases = {'db': self.queries.duration}
+        if self.view_started is not None:
+            phases['view'] = net_duration(
+                self.view_started, self.view_finished or finished
+            )
+        if self.render_finished is not None:
+            phases['render'] = net_duration(
+                self.view_finished, self.render_finished
+            )
+        phases['total'] = finished[0] - self.started[0]
+        return phases
+
+
+class RequestTimingMiddleware:
+    """Замеряет время SQL, представления и рендеринга ответа, отдаёт его
+    в заголовке Server-Timing и пишет строку JSON в лог api.middleware.
+
+    Одинаковые запросы, повторённые в одном запросе к API не меньше
+    REQUEST_TIMING_REPEATED_QUERIES раз, попадают в лог как вероятные N+1.
+    При REQUEST_TIMING = False middleware отключается при старте.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_TIMING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timing = request.timing = RequestTiming()
+        with connection.execute_wrapper(timing.queries):
+            response = self.get_response(request)
+        phases = timing.phases()
+        response['Server-Timing'] = ', '.join(
+            f'{name};dur={duration * 1000:.1f}'
+            + (f';desc="{timing.queries.count} queries"'
+               if name == 'db' else '')
+            for name, duration in phases.items()
+        )
+        self.log(request, response, timing, phases)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.timing.view_started = request.timing.mark()
+
+    def process_template_response(self, request, response):
+        timing = request.timing
+        timing.view_finished = timing.mark()
+
+        def render_finished(response):
+            timing.render_finished = timing.mark()
+
+        response.add_post_render_callback(render_finished)
+        return response
+
+    def log(self, request, response, timing, phases):
+        repeated = timing.queries.repeated(
+            settings.REQUEST_TIMING_REPEATED_QUERIES
+        )
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': timing.queries.count,
+        }
+        record.update(
+            (f'{name}_ms', round(duration * 1000, 1))
+            for name, duration in phases.items()
+        )
+        if repeated:
+            record['repeated_queries'] = repeated
+        logger.log(
+            logging.WARNING if repeated else logging.INFO,
+            json.dumps(record, ensure_ascii=False)
+        )
+
+
+def view_name(request, view_func):
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        return view_func.__name__
+    action = (getattr(view_func, 'actions', None) or {}).get(
+        request.method.lower()
+    )
+    if action is None:
+        return view_class.__name__
+    return f'{view_class.__name__}.{action}'
+
+
+class MetricsMiddleware:
+    """Считает запросы, их время и SQL-запросы по представлениям DRF
+    (RecipesViewSet.list, IngredientViewSet.retrieve, ...) для /api/metrics.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = QueryTimer()
+        started = time.perf_counter()
+        with connection.execute_wrapper(queries):
+            response = self.get_response(request)
+        view = getattr(request, 'metrics_view', 'unmatched')
+        registry.inc(
+            'foodgram_http_requests_total', view=view,
+            method=request.method, status=str(response.status_code)
+        )
+        registry.observe(
+            'foodgram_http_request_duration_seconds',
+            time.perf_counter() - started, view=view
+        )
+        registry.inc('foodgram_db_queries_total', queries.count, view=view)
+        registry.inc(
+            'foodgram_db_query_duration_seconds_total', queries.duration,
+            view=view
+        )
+        registry.flush()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics_view = view_name(request, view_func)
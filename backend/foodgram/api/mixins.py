@@ -1,4 +1,13 @@
-from rest_framework import mixins, viewsets
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import mixins, status, viewsets
+from rest_framework.response import Response
+
+from recipes.table_versions import get_table_version
+from .cache import reference_cache_enabled
+from .metrics import registry
 
 
 class ListRetrieveViewSet(
@@ -14,3 +23,76 @@ class ListRetrieveCreateViewSet(
     mixins.CreateModelMixin, viewsets.GenericViewSet
 ):
     pass
+
+
+class ReferenceCacheMixin:
+    """Условные GET и кэш ответов для редко меняющихся справочников.
+
+    Включается REFERENCE_CACHE и только при общем для процессов кэше.
+    ETag считается по версии таблицы из recipes.table_versions, поэтому
+    повторный запрос не обращается к БД, пока справочник не изменится.
+    Cache-Control отдаётся всегда: по нему nginx кэширует справочники.
+    """
+    # Ответы одинаковы для всех пользователей, а проверка токена стоила бы
+    # запроса к БД на каждый запрос справочника.
+    authentication_classes = ()
+    cache_max_age = 60 * 5
+
+    def get_cache_version(self):
+        return get_table_version(self.queryset.model)
+
+    def get_cache_key(self, request, version):
+        params = sorted(request.query_params.lists())
+        key = (
+            f'{version}:{request.accepted_renderer.format}:'
+            f'{request.path}:{params}'
+        )
+        return md5(key.encode()).hexdigest()
+
+    def is_not_modified(self, request, etag):
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '')
+        return etag in if_none_match or if_none_match.strip() == '*'
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        version = self.get_cache_version()
+        key = self.get_cache_key(request, version)
+        etag = f'"{key}"'
+        if self.is_not_modified(request, etag):
+            result = 'not_modified'
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            data = cache.get(f'response:{key}')
+            if data is None:
+                result = 'miss'
+                response = handler(request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                cache.set(
+                    f'response:{key}', response.data,
+                    settings.REFERENCE_CACHE_TIMEOUT
+                )
+            else:
+                result = 'hit'
+                response = Response(data)
+        registry.inc(
+            'foodgram_cache_requests_total', cache='reference', result=result
+        )
+        response['ETag'] = etag
+        return response
+
+    def respond(self, handler, request, *args, **kwargs):
+        if reference_cache_enabled():
+            response = self.cached_response(handler, request, *args, **kwargs)
+        else:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (
+            status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED
+        ):
+            response['Cache-Control'] = f'public, max-age={self.cache_max_age}'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.respond(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.respond(super().retrieve, request, *args, **kwargs)
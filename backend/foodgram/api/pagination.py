@@ -1,7 +1,144 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import connection
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def estimate_count(queryset):
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    return int(plan[0]['Plan']['Plan Rows'])
 
 
 class CustomPagination(PageNumberPagination):
+    """Постраничная пагинация с включаемым режимом курсора.
+
+    Запрос с параметром cursor (в том числе пустым) листает выборку по
+    её сортировке, если та заканчивается на id, иначе по keyset_ordering,
+    без OFFSET и без COUNT(*); count=exact или
+    count=approx добавляет в ответ точное или оценочное число записей.
+    """
     page_size = 6
     page_size_query_param = 'limit'
     max_page_size = 20
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    keyset_ordering = ('id',)
+    invalid_cursor_message = 'Неверный курсор'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.cursor_query_param in request.query_params
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+        self.request = request
+        page_size = self.get_page_size(request)
+        self.ordering = self.get_keyset_ordering(queryset)
+        queryset = queryset.order_by(*self.ordering)
+        self.count = self.get_count(queryset, request)
+        position = self.decode_cursor(request, queryset.model)
+        if position is not None:
+            queryset = queryset.filter(self.after(position))
+        results = list(queryset[:page_size + 1])
+        self.page = results[:page_size]
+        self.has_next = len(results) > page_size
+        return self.page
+
+    def get_count(self, queryset, request):
+        mode = request.query_params.get(self.count_query_param)
+        if mode == 'exact':
+            return queryset.count()
+        if mode == 'approx':
+            return estimate_count(queryset)
+        return None
+
+    def get_keyset_ordering(self, queryset):
+        ordering = tuple(queryset.query.order_by)
+        if ordering and ordering[-1].lstrip('-') == 'id':
+            return ordering
+        return self.keyset_ordering
+
+    def get_keyset_fields(self):
+        return [
+            (name.lstrip('-'), name.startswith('-'))
+            for name in self.ordering
+        ]
+
+    def decode_cursor(self, request, model):
+        cursor = request.query_params[self.cursor_query_param]
+        if not cursor:
+            return None
+        fields = self.get_keyset_fields()
+        try:
+            values = json.loads(urlsafe_b64decode(cursor.encode()).decode())
+            if not isinstance(values, list) or len(values) != len(fields):
+                raise ValueError
+            return [
+                self.to_python(model, name, value)
+                for (name, _), value in zip(fields, values)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def to_python(self, model, name, value):
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            if not isinstance(value, (int, float)):
+                raise ValueError
+            return value
+        return field.to_python(value)
+
+    def encode_cursor(self, instance):
+        values = []
+        for name, _ in self.get_keyset_fields():
+            value = getattr(instance, name)
+            values.append(
+                value.isoformat() if hasattr(value, 'isoformat') else value
+            )
+        return urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def after(self, position):
+        condition = Q()
+        equal = Q()
+        for (name, descending), value in zip(
+            self.get_keyset_fields(), position
+        ):
+            lookup = 'lt' if descending else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def get_next_link(self):
+        if self.keyset:
+            if not self.has_next:
+                return None
+            return replace_query_param(
+                self.request.build_absolute_uri(),
+                self.cursor_query_param,
+                self.encode_cursor(self.page[-1])
+            )
+        return super().get_next_link()
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        response = OrderedDict(next=self.get_next_link())
+        if self.count is not None:
+            response['count'] = self.count
+        response['results'] = data
+        return Response(response)
+
+
+class RecipesPagination(CustomPagination):
+    keyset_ordering = ('-pub_date', '-id')
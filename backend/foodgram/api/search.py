@@ -0,0 +1,125 @@
+from bisect import bisect_left
+from threading import Lock
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, IntegerField, Value, When
+from rest_framework import filters
+from rest_framework.settings import api_settings
+
+from recipes.models import Ingredient
+from recipes.table_versions import get_table_version
+
+INGREDIENT_SEARCH_LIMIT = 50
+
+
+class IngredientIndex:
+    """Поиск по началу названия, затем по началу любого слова в названии."""
+
+    def __init__(self, ingredients):
+        names, words = [], []
+        for pk, name, _ in ingredients:
+            key = name.lower()
+            names.append((key, pk))
+            position = key.find(' ')
+            while position != -1:
+                words.append((key[position + 1:], pk))
+                position = key.find(' ', position + 1)
+        self.names = self.build(names)
+        self.words = self.build(words)
+
+    @staticmethod
+    def build(entries):
+        entries.sort()
+        return [key for key, _ in entries], [pk for _, pk in entries]
+
+    def __len__(self):
+        return len(self.names[1])
+
+    def search(self, query, limit=INGREDIENT_SEARCH_LIMIT):
+        query = query.lower()
+        result = {}
+        for keys, pks in (self.names, self.words):
+            position = bisect_left(keys, query)
+            while (
+                len(result) < limit
+                and position < len(keys)
+                and keys[position].startswith(query)
+            ):
+                result.setdefault(pks[position])
+                position += 1
+        return list(result)
+
+
+class IngredientIndexHolder:
+    """Строится лениво в каждом процессе и перестраивается, когда версия
+    таблицы ингредиентов в общем кэше изменилась.
+    """
+
+    def __init__(self):
+        self.index = None
+        self.version = None
+        self.lock = Lock()
+
+    def get(self):
+        version = get_table_version(Ingredient)
+        index = self.index
+        if index is not None and self.version == version:
+            return index
+        with self.lock:
+            if self.index is None or self.version != version:
+                self.index = IngredientIndex(
+                    Ingredient.objects.values_list(
+                        'pk', 'name', 'measurement_unit'
+                    ).order_by().iterator()
+                )
+                self.version = version
+            return self.index
+
+
+ingredient_index = IngredientIndexHolder()
+
+
+class IngredientSearchFilter(filters.BaseFilterBackend):
+    """Совпадения с начала названия выше совпадений внутри названия.
+
+    На PostgreSQL запрос обслуживают индексы из миграции по UPPER(name).
+    При INGREDIENT_INDEX_CACHE, а также на остальных СУБД (LIKE в SQLite
+    не учитывает регистр кириллицы) порядок находит IngredientIndex,
+    а из таблицы строки читаются по первичному ключу. Число результатов
+    ограничивает представление (search_limit).
+    """
+    search_param = api_settings.SEARCH_PARAM
+
+    def get_search_limit(self, view):
+        return getattr(view, 'search_limit', INGREDIENT_SEARCH_LIMIT)
+
+    def use_index(self):
+        return (
+            settings.INGREDIENT_INDEX_CACHE
+            or connection.vendor != 'postgresql'
+        )
+
+    def get_search_query(self, request):
+        return request.query_params.get(self.search_param, '').strip()
+
+    def filter_queryset(self, request, queryset, view):
+        query = self.get_search_query(request)
+        if getattr(view, 'action', None) != 'list' or not query:
+            return queryset
+        if self.use_index():
+            pks = ingredient_index.get().search(
+                query, self.get_search_limit(view)
+            )
+            return queryset.filter(pk__in=pks).order_by(Case(
+                *(When(pk=pk, then=Value(position))
+                  for position, pk in enumerate(pks)),
+                output_field=IntegerField()
+            ))
+        return queryset.filter(name__icontains=query).annotate(
+            search_rank=Case(
+                When(name__istartswith=query, then=Value(0)),
+                default=Value(1),
+                output_field=IntegerField()
+            )
+        ).order_by('search_rank', 'name', 'pk')
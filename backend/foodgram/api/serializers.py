@@ -1,14 +1,29 @@
 import base64
+import binascii
+import json
 
+from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from rest_framework import serializers
 from djoser.serializers import UserSerializer
-from django.core.files.base import ContentFile
 
 from recipes.models import (
     User, Tag, Ingredient, Recipes,
     IngredientRecipe, Favorite, ListToBuy, Subscript
 )
+from recipes import images, shopping_cart
+
+BASE64_CHUNK_SIZE = 64 * 1024
+RECIPE_PREFETCH = (
+    Prefetch('tags', queryset=Tag.objects.all()),
+    Prefetch(
+        'ingredientrecipe',
+        queryset=IngredientRecipe.objects.select_related('ingredient')
+    ),
+)
 
 
 class CustomUserSerializer(UserSerializer):
@@ -29,6 +44,10 @@ class CustomUserSerializer(UserSerializer):
         return user
 
     def get_is_subscribed(self, obj):
+        if 'is_subscribed' in self.context:
+            return self.context['is_subscribed']
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         if self.context['request'].user.is_authenticated:
             return Subscript.objects.filter(
                 author=obj, user=self.context['request'].user
@@ -61,6 +80,45 @@ class IngredientRecipeSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
 
+class Base64ImageField(serializers.ImageField):
+    """Картинка строкой data:image/<тип>;base64,<данные>.
+
+    Декодируется частями во временный файл; строки, которые после
+    декодирования больше RECIPE_IMAGE_MAX_SIZE, отклоняются до декодирования.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, str):
+            data = self.decode(data)
+        return super().to_internal_value(data)
+
+    def decode(self, data):
+        header, separator, encoded = data.partition(';base64,')
+        if not separator:
+            raise serializers.ValidationError(
+                'Картинка должна быть передана в формате base64'
+            )
+        max_size = settings.RECIPE_IMAGE_MAX_SIZE
+        if len(encoded) // 4 * 3 - encoded[-2:].count('=') > max_size:
+            raise serializers.ValidationError(
+                f'Размер картинки больше {max_size} байт'
+            )
+        file = TemporaryUploadedFile(
+            'temp.' + header.split('/')[-1], header[len('data:'):], 0, None
+        )
+        try:
+            for start in range(0, len(encoded), BASE64_CHUNK_SIZE):
+                file.write(base64.b64decode(
+                    encoded[start:start + BASE64_CHUNK_SIZE]
+                ))
+        except (binascii.Error, ValueError):
+            file.close()
+            raise serializers.ValidationError('Некорректная строка base64')
+        file.size = file.tell()
+        file.seek(0)
+        return file
+
+
 class TagSerializer(serializers.ModelSerializer):
 
     class Meta:
@@ -69,7 +127,7 @@ class TagSerializer(serializers.ModelSerializer):
 
 
 class RecipesSerializer(serializers.ModelSerializer):
-    author = CustomUserSerializer(read_only=True)
+    author = serializers.SerializerMethodField()
     tags = TagSerializer(
         read_only=True,
         many=True
@@ -82,16 +140,25 @@ class RecipesSerializer(serializers.ModelSerializer):
     text = serializers.CharField(required=True)
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipes
         fields = (
             'id', 'name', 'author',
-            'ingredients', 'tags', 'is_favorited', 'image',
+            'ingredients', 'tags', 'is_favorited', 'image', 'image_variants',
             'is_in_shopping_cart', 'cooking_time', 'text'
         )
 
+    def get_author(self, obj):
+        context = self.context
+        if hasattr(obj, 'author_is_subscribed'):
+            context = dict(context, is_subscribed=obj.author_is_subscribed)
+        return CustomUserSerializer(obj.author, context=context).data
+
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         if self.context['request'].user.is_authenticated:
             return Favorite.objects.filter(
                 recipe=obj, user=self.context['request'].user
@@ -99,18 +166,38 @@ class RecipesSerializer(serializers.ModelSerializer):
         return False
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         if self.context['request'].user.is_authenticated:
             return ListToBuy.objects.filter(
                 recipe=obj, user=self.context['request'].user
             ).exists()
         return False
 
+    def get_image_variants(self, obj):
+        urls = images.variant_urls(obj)
+        request = self.context.get('request')
+        if urls is None or request is None:
+            return urls
+        return {
+            variant: request.build_absolute_uri(url)
+            for variant, url in urls.items()
+        }
+
+
+def get_in_bulk(queryset, ids, message):
+    """Находит объекты по списку id одним запросом."""
+    objects = queryset.in_bulk(ids)
+    missing = [str(pk) for pk in ids if pk not in objects]
+    if missing:
+        raise serializers.ValidationError(
+            message.format(ids=', '.join(missing))
+        )
+    return objects
+
 
 class IngredientRecipeCreateSerializer(serializers.ModelSerializer):
-    id = serializers.SlugRelatedField(
-        slug_field='id',
-        queryset=Ingredient.objects.all(),
-    )
+    id = serializers.IntegerField()
 
     class Meta:
         model = IngredientRecipe
@@ -122,13 +209,10 @@ class RecipesCreateSerializer(serializers.ModelSerializer):
         default=serializers.CurrentUserDefault(),
         slug_field='username',
         read_only=True)
-    tags = serializers.SlugRelatedField(
-        slug_field='id',
-        queryset=Tag.objects.all(),
-        many=True,
-    )
+    tags = serializers.ListField(child=serializers.IntegerField())
     ingredients = IngredientRecipeCreateSerializer(many=True)
     text = serializers.CharField(required=True)
+    image = Base64ImageField(required=False)
 
     class Meta:
         model = Recipes
@@ -138,35 +222,57 @@ class RecipesCreateSerializer(serializers.ModelSerializer):
         )
 
     def to_internal_value(self, data):
-        if 'image' not in data:
-            return super(RecipesCreateSerializer, self).to_internal_value(data)
-        imgstr = data.get('image')
-        format, imgstr = imgstr.split(';base64,')
-        ext = format.split('/')[-1]
-        image = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
-        data['image'] = image
-        return super(RecipesCreateSerializer, self).to_internal_value(data)
+        if hasattr(data, 'getlist') and 'ingredients' in data:
+            data = self.parse_form(data)
+        return super().to_internal_value(data)
+
+    def parse_form(self, form):
+        """multipart/form-data: картинка файлом, теги повторяющимся полем
+        tags или JSON-списком, ингредиенты JSON-списком.
+        """
+        data = form.dict()
+        for name in ('tags', 'ingredients'):
+            values = form.getlist(name)
+            if len(values) == 1 and values[0].lstrip().startswith('['):
+                try:
+                    data[name] = json.loads(values[0])
+                except ValueError:
+                    raise serializers.ValidationError(
+                        {name: ['Некорректный JSON']}
+                    )
+            elif values:
+                data[name] = values
+        return data
 
     def validate_tags(self, value):
         if not value:
             raise serializers.ValidationError('Укажите Теги')
-        return value
+        tags = get_in_bulk(
+            Tag.objects.all(), value, 'Тегов с id {ids} не существует'
+        )
+        return [tags[pk] for pk in dict.fromkeys(value)]
 
     def validate_ingredients(self, value):
-        ingr_list = []
+        if not value:
+            raise serializers.ValidationError('Укажите Ингредиенты')
+        ingr_ids = set()
         for data in value:
-            ingr_id = data['id'].pk
-            if not data:
-                raise serializers.ValidationError('Укажите Ингредиенты')
-            if ingr_id in ingr_list:
+            ingr_id = data['id']
+            if ingr_id in ingr_ids:
                 raise serializers.ValidationError(
                     'Нельзя указывать 2 одинаковых ингредиента'
                 )
-            ingr_list.append(ingr_id)
+            ingr_ids.add(ingr_id)
             if int(data['amount']) <= 0:
                 raise serializers.ValidationError(
                     f'Укажите кол-во для ингредиента id={ingr_id} больше 0'
                 )
+        ingredients = get_in_bulk(
+            Ingredient.objects.all(), [data['id'] for data in value],
+            'Ингредиентов с id {ids} не существует'
+        )
+        for data in value:
+            data['id'] = ingredients[data['id']]
         return value
 
     def create_ingredients(self, recipe, ingredients):
@@ -186,18 +292,54 @@ class RecipesCreateSerializer(serializers.ModelSerializer):
         recipe = Recipes.objects.create(**validated_data)
         recipe.tags.set(tags)
         self.create_ingredients(recipe, ingredients)
+        images.schedule_variants(recipe)
         return recipe
 
+    def update_ingredients(self, recipe, ingredients):
+        rows = {
+            row.ingredient_id: row
+            for row in IngredientRecipe.objects.filter(recipe=recipe)
+        }
+        old_amounts = {pk: row.amount for pk, row in rows.items()}
+        new_amounts = {
+            ingredient['id'].pk: ingredient['amount']
+            for ingredient in ingredients
+        }
+        removed = [
+            row.pk for pk, row in rows.items() if pk not in new_amounts
+        ]
+        if removed:
+            IngredientRecipe.objects.filter(pk__in=removed).delete()
+        changed = []
+        for pk, amount in new_amounts.items():
+            if pk in rows and rows[pk].amount != amount:
+                rows[pk].amount = amount
+                changed.append(rows[pk])
+        IngredientRecipe.objects.bulk_update(changed, ['amount'])
+        self.create_ingredients(recipe, [
+            ingredient for ingredient in ingredients
+            if ingredient['id'].pk not in rows
+        ])
+        shopping_cart.change_recipe(recipe.pk, old_amounts, new_amounts)
+
+    @transaction.atomic
     def update(self, instance, validated_data):
-        instance.tags.clear()
-        tags = validated_data.pop('tags')
-        instance.tags.set(tags)
-        ingredients = validated_data.pop('ingredients')
-        IngredientRecipe.objects.filter(recipe=instance).delete()
-        self.create_ingredients(instance, ingredients)
-        return super().update(instance, validated_data)
+        if 'tags' in validated_data:
+            instance.tags.set(validated_data.pop('tags'))
+        if 'ingredients' in validated_data:
+            self.update_ingredients(
+                instance, validated_data.pop('ingredients')
+            )
+        old_image = instance.image.name
+        instance = super().update(instance, validated_data)
+        if instance.image.name != old_image:
+            instance.image_variants_ready = False
+            instance.save(update_fields=['image_variants_ready', 'updated_at'])
+            images.schedule_variants(instance)
+        return instance
 
     def to_representation(self, value):
+        prefetch_related_objects([value], *RECIPE_PREFETCH)
         return RecipesSerializer(
             value, context=self.context
         ).to_representation(value)
@@ -222,36 +364,30 @@ class SubscriptSerializer(CustomUserSerializer):
         )
 
     def get_recipes(self, obj):
-        queryset = Recipes.objects.filter(author=obj)
-        if 'recipes_limit' in self.context:
-            recipes_limit = int(self.context['recipes_limit'])
-            queryset = Recipes.objects.filter(author=obj)[:recipes_limit]
+        if hasattr(obj, 'page_recipes'):
+            queryset = obj.page_recipes
+        else:
+            queryset = Recipes.objects.filter(author=obj)
+            recipes_limit = self.context.get('recipes_limit')
+            if recipes_limit is not None:
+                queryset = queryset[:int(recipes_limit)]
         return RecipesSubscriptSerializer(queryset, many=True).data
 
     def get_recipes_count(self, obj):
+        if hasattr(obj, 'recipes_count'):
+            return obj.recipes_count
         return Recipes.objects.filter(author=obj).count()
 
 
 class SubscriptCreateSerializer(serializers.ModelSerializer):
+    exists_message = 'Вы уже подписаны на этого автора'
+    missing_message = 'Вы не подписаны на это автора'
+    self_message = 'На себя подписаться нельзя'
 
     class Meta:
         model = Subscript
         fields = '__all__'
 
-    def validate(self, value):
-        method = self.context["request"].method
-        author_list = value['user'].follower.values_list('author', flat=True)
-        if method == 'POST':
-            if value['user'] == value['author']:
-                raise serializers.ValidationError('На себя подписаться нельзя')
-            if value['author'].pk in author_list:
-                raise serializers.ValidationError(
-                    'Вы уже подписаны на этого автора'
-                )
-        elif method == 'DELETE' and value['author'].pk not in author_list:
-            raise serializers.ValidationError('Вы не подписаны на это автора')
-        return value
-
     def to_representation(self, instance):
         return SubscriptSerializer(
             instance.author, context=self.context
@@ -259,50 +395,48 @@ class SubscriptCreateSerializer(serializers.ModelSerializer):
 
 
 class FavoriteRecipesCreateSerializer(serializers.ModelSerializer):
+    exists_message = 'Рецепт уже в избранном'
+    missing_message = 'Рецепта нет в избранном'
 
     class Meta:
         model = Favorite
         fields = '__all__'
 
-    def validate(self, value):
-        method = self.context["request"].method
-        recipe_list = value['user'].favorite.values_list('recipe', flat=True)
-        if method == 'POST' and value['recipe'].pk in recipe_list:
-            raise serializers.ValidationError('Рецепт уже в избранном')
-        elif method == 'DELETE' and value['recipe'].pk not in recipe_list:
-            raise serializers.ValidationError('Рецепта нет в избранном')
-        return value
-
     def to_representation(self, instance):
         return RecipesSubscriptSerializer(instance.recipe).data
 
 
 class ListToBuyRecipesCreateSerializer(serializers.ModelSerializer):
+    exists_message = 'Рецепт уже в списке'
+    missing_message = 'Рецепта нет в списке'
 
     class Meta:
         model = ListToBuy
         fields = '__all__'
 
-    def validate(self, value):
-        method = self.context["request"].method
-        recipe_list = value['user'].listtobuy.values_list('recipe', flat=True)
-        if method == 'POST' and value['recipe'].pk in recipe_list:
-            raise serializers.ValidationError('Рецепт уже в списке')
-        elif method == 'DELETE' and value['recipe'].pk not in recipe_list:
-            raise serializers.ValidationError('Рецепта нет в списке')
-        return value
-
     def to_representation(self, instance):
         return RecipesSubscriptSerializer(instance.recipe).data
 
 
+class RecipeIdsSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(), allow_empty=False, max_length=100
+    )
+
+    def validate_ids(self, value):
+        value = list(dict.fromkeys(value))
+        recipes = get_in_bulk(
+            Recipes.objects.all(), value, 'Рецептов с id {ids} не существует'
+        )
+        return [recipes[pk] for pk in value]
+
+
 class SetPasswordSerializer(serializers.Serializer):
     new_password = serializers.CharField(style={"input_type": "password"})
     current_password = serializers.CharField(style={"input_type": "password"})
 
     def validate_current_password(self, value):
         is_password_valid = self.context["request"].user.check_password(value)
-        if is_password_valid:
-            return value
-        else:
+        if not is_password_valid:
             raise serializers.ValidationError('Неверный пароль')
+        return value
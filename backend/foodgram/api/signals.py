@@ -0,0 +1,103 @@
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete
+)
+from django.dispatch import receiver
+
+from foodgram.backends.postgresql_pool.signals import (
+    pool_connection_acquired, pool_connection_created
+)
+from recipes.models import Ingredient, IngredientRecipe, Recipes, Tag, User
+from recipes.table_versions import bump_table_version
+from .cache import recipe_feed_cache
+from .metrics import registry
+
+AUTHOR_FIELDS = {'email', 'username', 'first_name', 'last_name'}
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def bump_reference_version(sender, **kwargs):
+    bump_table_version(sender)
+
+
+@receiver(post_delete, sender=Recipes)
+def drop_recipe_body(instance, **kwargs):
+    recipe_feed_cache.delete_many([instance.pk])
+
+
+@receiver(post_save, sender=IngredientRecipe)
+@receiver(post_delete, sender=IngredientRecipe)
+def drop_ingredient_recipe_body(instance, **kwargs):
+    recipe_feed_cache.delete_many([instance.recipe_id])
+
+
+@receiver(m2m_changed, sender=Recipes.tags.through)
+def drop_tagged_recipe_bodies(instance, reverse, pk_set, **kwargs):
+    if not reverse:
+        recipe_feed_cache.delete_many([instance.pk])
+    elif pk_set:
+        recipe_feed_cache.delete_many(pk_set)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def drop_tag_recipe_bodies(instance, **kwargs):
+    recipe_feed_cache.delete_many(
+        instance.recipes.values_list('pk', flat=True)
+    )
+
+
+@receiver(post_save, sender=Ingredient)
+def drop_ingredient_bodies(instance, created, **kwargs):
+    if not created:
+        recipe_feed_cache.delete_many(
+            instance.ingredientrecipe.values_list('recipe_id', flat=True)
+        )
+
+
+@receiver(post_save, sender=User)
+def drop_author_recipe_bodies(instance, created, update_fields, **kwargs):
+    if created or (update_fields and not AUTHOR_FIELDS & set(update_fields)):
+        return
+    recipe_feed_cache.delete_many(
+        instance.recipes.values_list('pk', flat=True)
+    )
+
+
+@receiver(connection_created)
+def count_connection(connection, **kwargs):
+    if not getattr(connection, 'pooled', False):
+        registry.inc('foodgram_db_connections_created_total',
+                     alias=connection.alias)
+
+
+@receiver(pool_connection_created)
+def count_pool_connection(alias, **kwargs):
+    registry.inc('foodgram_db_connections_created_total', alias=alias)
+
+
+@receiver(pool_connection_acquired)
+def count_pool_wait(alias, wait, **kwargs):
+    registry.inc('foodgram_db_pool_wait_seconds_total', wait, alias=alias)
+
+
+@receiver(request_started)
+def check_connections(**kwargs):
+    """Закрывает оставшееся с прошлого запроса соединение, если БД его
+    разорвала: Django откроет новое вместо ошибки в текущем запросе.
+    """
+    if not settings.DB_CONN_HEALTH_CHECKS:
+        return
+    for connection in connections.all():
+        if (
+            connection.connection is not None
+            and not connection.in_atomic_block
+            and not connection.is_usable()
+        ):
+            connection.close()
@@ -0,0 +1,66 @@
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from recipes.models import Favorite, ListToBuy, ListToBuyIngredient, Recipes
+from .utils import create_ingredient, create_recipe, create_user
+
+
+class BatchToggleTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        author = create_user()
+        cls.flour = create_ingredient()
+        cls.recipes = [
+            create_recipe(author, ingredients={cls.flour: 100})
+            for _ in range(4)
+        ]
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def post(self, url_name, recipes):
+        return self.client.post(
+            reverse(url_name), {'ids': [recipe.pk for recipe in recipes]},
+            format='json'
+        )
+
+    def counts(self, counter):
+        return list(Recipes.objects.filter(
+            pk__in=[recipe.pk for recipe in self.recipes]
+        ).order_by('pk').values_list(counter, flat=True))
+
+    def test_add_skips_existing_rows(self):
+        self.post('recipes-favorite-batch', self.recipes[:1])
+        response = self.post('recipes-favorite-batch', self.recipes[:3])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Favorite.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(self.counts('favorites_count'), [1, 1, 1, 0])
+
+    def test_add_queries_do_not_depend_on_batch_size(self):
+        # Рецепты из ids, блокировка пользователя, уже добавленные
+        # рецепты, вставка, счётчики и точка сохранения транзакции.
+        with self.assertNumQueries(7):
+            self.post('recipes-favorite-batch', self.recipes[:1])
+        with self.assertNumQueries(7):
+            self.post('recipes-favorite-batch', self.recipes[1:])
+        self.assertEqual(self.counts('favorites_count'), [1, 1, 1, 1])
+
+    def test_shopping_cart_add_and_remove(self):
+        self.post('recipes-shopping-cart-batch', self.recipes[:2])
+        self.post('recipes-shopping-cart-batch', self.recipes[1:3])
+        self.assertEqual(ListToBuy.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(self.counts('in_carts_count'), [1, 1, 1, 0])
+        self.assertEqual(ListToBuyIngredient.objects.get(
+            user=self.user, ingredient=self.flour
+        ).amount, 300)
+        response = self.client.delete(
+            reverse('recipes-shopping-cart-batch'),
+            {'ids': [recipe.pk for recipe in self.recipes[:2]]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.counts('in_carts_count'), [0, 0, 1, 0])
+        self.assertEqual(ListToBuyIngredient.objects.get(
+            user=self.user, ingredient=self.flour
+        ).amount, 100)
@@ -0,0 +1,67 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.checks import run_checks
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from .utils import create_ingredient, create_recipe, create_tag, create_user
+
+
+class RecipeFeedCacheData(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user()
+        cls.tag = create_tag()
+        cls.ingredient = create_ingredient()
+        cls.recipe = create_recipe(
+            cls.author, [cls.tag], {cls.ingredient: 100}
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def get_recipe(self):
+        response = self.client.get(reverse('recipes-list'))
+        self.assertEqual(response.status_code, 200)
+        return response.data['results'][0]
+
+
+class RecipeFeedCacheTest(RecipeFeedCacheData):
+    def test_disabled_by_default(self):
+        self.get_recipe()
+        self.assertIsNone(cache.get(f'recipe-body:{self.recipe.pk}'))
+
+    @override_settings(RECIPE_FEED_CACHE=True)
+    def test_needs_shared_cache(self):
+        self.assertIn('api.E002', [error.id for error in run_checks()])
+        self.get_recipe()
+        self.assertIsNone(cache.get(f'recipe-body:{self.recipe.pk}'))
+
+
+@override_settings(RECIPE_FEED_CACHE=True)
+@mock.patch('api.cache.LOCAL_CACHE_BACKENDS', ())
+class SharedRecipeFeedCacheTest(RecipeFeedCacheData):
+    def test_cached_body_is_reused(self):
+        self.get_recipe()
+        self.assertIsNotNone(cache.get(f'recipe-body:{self.recipe.pk}'))
+        # COUNT и страница рецептов: теги и ингредиенты взяты из кэша.
+        with self.assertNumQueries(2):
+            self.get_recipe()
+
+    def test_tag_rename_reaches_cached_feed(self):
+        self.get_recipe()
+        self.tag.name = 'Ужин'
+        self.tag.save()
+        self.assertEqual(self.get_recipe()['tags'][0]['name'], 'Ужин')
+
+    def test_ingredient_and_author_edits_reach_cached_feed(self):
+        self.get_recipe()
+        self.ingredient.name = 'Мука'
+        self.ingredient.save()
+        self.author.first_name = 'Пётр'
+        self.author.save()
+        recipe = self.get_recipe()
+        self.assertEqual(recipe['ingredients'][0]['name'], 'Мука')
+        self.assertEqual(recipe['author']['first_name'], 'Пётр')
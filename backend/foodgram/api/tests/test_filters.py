@@ -0,0 +1,127 @@
+from types import SimpleNamespace
+
+from django.db import connection
+from django.test import TestCase, skipUnlessDBFeature
+
+from api.filters import RecipesFilter
+from recipes.models import Favorite, ListToBuy, Recipes
+from .utils import create_recipe, create_tag, create_user
+
+
+def plan_nodes(plan):
+    yield plan
+    for child in plan.get('Plans', ()):
+        yield from plan_nodes(child)
+
+
+class RecipesFilterData(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        author = create_user()
+        cls.breakfast, cls.dinner, cls.dessert = (
+            create_tag(), create_tag(), create_tag()
+        )
+        cls.both = create_recipe(author, [cls.breakfast, cls.dinner])
+        cls.dinner_only = create_recipe(author, [cls.dinner])
+        cls.dessert_only = create_recipe(cls.user, [cls.dessert])
+        Favorite.objects.create(user=cls.user, recipe=cls.both)
+        ListToBuy.objects.create(user=cls.user, recipe=cls.dinner_only)
+
+    def filter(self, **params):
+        return RecipesFilter(
+            params,
+            queryset=Recipes.objects.order_by('-pub_date', '-id'),
+            request=SimpleNamespace(user=self.user)
+        ).qs
+
+
+class RecipesFilterTest(RecipesFilterData):
+    def test_tags_do_not_duplicate_recipes(self):
+        queryset = self.filter(tags=[self.breakfast.slug, self.dinner.slug])
+        self.assertEqual(list(queryset), [self.dinner_only, self.both])
+        self.assertNotIn('DISTINCT', str(queryset.query))
+
+    def test_user_relations(self):
+        self.assertEqual(list(self.filter(is_favorited='1')), [self.both])
+        self.assertEqual(
+            list(self.filter(is_in_shopping_cart='1')), [self.dinner_only]
+        )
+        self.assertEqual(
+            list(self.filter(is_favorited='0')),
+            [self.dessert_only, self.dinner_only]
+        )
+
+    def test_anonymous_user_is_not_filtered(self):
+        queryset = RecipesFilter(
+            {'is_favorited': '1'},
+            queryset=Recipes.objects.all(),
+            request=SimpleNamespace(user=SimpleNamespace(
+                is_authenticated=False
+            ))
+        ).qs
+        self.assertEqual(queryset.count(), 3)
+
+
+@skipUnlessDBFeature('is_postgresql_10')
+class RecipesFilterPlanTest(RecipesFilterData):
+    """Планы запросов фильтров.
+
+    В тестовой базе слишком мало строк, чтобы планировщик сам выбрал
+    индексы, поэтому последовательное чтение запрещено: запрос, который
+    не может обойтись без Seq Scan, значит, не покрыт индексом.
+    """
+
+    def explain(self, queryset):
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            return list(plan_nodes(cursor.fetchone()[0][0]['Plan']))
+
+    def indexes(self, nodes):
+        return {
+            node['Index Name'] for node in nodes if 'Index Name' in node
+        }
+
+    def assert_no_seq_scan(self, nodes):
+        self.assertEqual(
+            [node['Relation Name'] for node in nodes
+             if node['Node Type'] == 'Seq Scan'],
+            []
+        )
+
+    def assert_index_scan(self, nodes, model):
+        scans = {
+            node['Node Type'] for node in nodes
+            if node.get('Relation Name') == model._meta.db_table
+        }
+        self.assertTrue(scans)
+        self.assertLessEqual(
+            scans, {'Index Scan', 'Index Only Scan', 'Bitmap Heap Scan'}
+        )
+
+    def test_favorited_plan(self):
+        nodes = self.explain(self.filter(is_favorited='1'))
+        self.assert_no_seq_scan(nodes)
+        self.assert_index_scan(nodes, Favorite)
+
+    def test_shopping_cart_plan(self):
+        nodes = self.explain(self.filter(is_in_shopping_cart='1'))
+        self.assert_no_seq_scan(nodes)
+        self.assert_index_scan(nodes, ListToBuy)
+
+    def test_tags_plan(self):
+        nodes = self.explain(
+            self.filter(tags=[self.breakfast.slug, self.dinner.slug])
+        )
+        self.assert_no_seq_scan(nodes)
+        self.assertIn(
+            'recipes_recipes_tags_tag_recipe_idx', self.indexes(nodes)
+        )
+
+    def test_author_plan(self):
+        nodes = self.explain(self.filter(author=self.user.pk))
+        self.assert_no_seq_scan(nodes)
+        self.assertIn('recipes_author_pub_date_idx', self.indexes(nodes))
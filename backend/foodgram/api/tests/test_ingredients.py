@@ -0,0 +1,72 @@
+from django.core.cache import cache
+from django.db.models import QuerySet
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from api.search import IngredientSearchFilter
+from api.views import IngredientViewSet
+from recipes.models import Ingredient
+from .utils import create_ingredient
+
+NAMES = ('Сахар', 'Сахарная пудра', 'Ванильный сахар', 'Соль', 'Мука')
+
+
+class IngredientSearchTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for name in NAMES:
+            create_ingredient(name)
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, query):
+        response = self.client.get(reverse('ingredient-list'), {'name': query})
+        self.assertEqual(response.status_code, 200)
+        return [ingredient['name'] for ingredient in response.data]
+
+    def filter(self, query):
+        view = IngredientViewSet(action='list')
+        view.request = Request(APIRequestFactory().get('/', {'name': query}))
+        return IngredientSearchFilter().filter_queryset(
+            view.request, Ingredient.objects.all(), view
+        )
+
+    def check_search(self):
+        self.assertEqual(
+            self.search('сах'), ['Сахар', 'Сахарная пудра', 'Ванильный сахар']
+        )
+        self.assertEqual(self.search('СОЛ'), ['Соль'])
+        self.assertEqual(self.search('нет такого'), [])
+        self.assertEqual(len(self.search('')), len(NAMES))
+
+    @override_settings(INGREDIENT_INDEX_CACHE=True)
+    def test_index(self):
+        self.check_search()
+
+    def test_database(self):
+        self.check_search()
+
+    @override_settings(INGREDIENT_INDEX_CACHE=True)
+    def test_index_returns_queryset(self):
+        queryset = self.filter('сах')
+        self.assertIsInstance(queryset, QuerySet)
+        self.assertEqual(
+            list(queryset.filter(name__startswith='С').values_list(
+                'name', flat=True
+            )),
+            ['Сахар', 'Сахарная пудра']
+        )
+
+    def test_limit_is_applied_by_view(self):
+        self.assertIsInstance(self.filter('с'), QuerySet)
+        with self.settings(INGREDIENT_INDEX_CACHE=True):
+            self.assertEqual(len(self.filter('с')), 4)
+        limit = IngredientViewSet.search_limit
+        try:
+            IngredientViewSet.search_limit = 2
+            self.assertEqual(self.search('сах'), ['Сахар', 'Сахарная пудра'])
+        finally:
+            IngredientViewSet.search_limit = limit
@@ -0,0 +1,77 @@
+import json
+import os
+import tempfile
+
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from api import metrics
+from api.metrics import ARCHIVE, Registry
+
+COUNTER = 'foodgram_http_requests_total'
+GAUGE = 'foodgram_db_pool_size_max'
+LABELS = (('view', 'TagViewSet.list'),)
+
+
+class MetricsViewTest(SimpleTestCase):
+    @override_settings(METRICS=False)
+    def test_disabled_by_default(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
+
+
+class RegistrySnapshotsTest(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        settings = override_settings(
+            METRICS=True, METRICS_DIR=self.directory
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.registry = Registry()
+
+    def write(self, pid, started, counter, gauge=1):
+        with open(os.path.join(self.directory, f'{pid}-{started}.json'),
+                  'w') as file:
+            json.dump({
+                'pid': pid, 'started': started,
+                'values': [[COUNTER, LABELS, counter]],
+                'gauges': [[GAUGE, [], gauge]],
+            }, file)
+
+    def test_dead_process_is_archived(self):
+        # Родительский процесс жив, а pid 2 ** 22 + 1 больше pid_max.
+        self.write(os.getppid(), 1, 5, gauge=10)
+        self.write(2 ** 22 + 1, 1, 7, gauge=20)
+        values = self.registry.collect()
+        self.assertEqual(values[(COUNTER, LABELS)], 12)
+        self.assertEqual(values[(GAUGE, ())], 10)
+        self.assertEqual(
+            sorted(os.listdir(self.directory)),
+            sorted([ARCHIVE, f'{os.getppid()}-1.json', 'archive.lock'])
+        )
+        self.assertEqual(self.registry.collect()[(COUNTER, LABELS)], 12)
+
+    def test_reused_pid_keeps_dead_counters(self):
+        self.write(os.getppid(), 1, 5, gauge=10)
+        self.write(os.getppid(), 2, 3, gauge=30)
+        values = self.registry.collect()
+        self.assertEqual(values[(COUNTER, LABELS)], 8)
+        self.assertEqual(values[(GAUGE, ())], 30)
+        self.assertNotIn(f'{os.getppid()}-1.json', os.listdir(self.directory))
+
+    def test_flush_does_not_overwrite_previous_process(self):
+        self.write(os.getpid(), 1, 5)
+        self.registry.inc(COUNTER, view='TagViewSet.list')
+        self.registry.flush(force=True)
+        self.assertEqual(self.registry.collect()[(COUNTER, LABELS)], 6)
+
+    def test_disabled_metrics_leave_no_snapshots(self):
+        with override_settings(METRICS=False):
+            self.registry.inc(COUNTER, view='TagViewSet.list')
+            self.registry.observe('foodgram_http_request_duration_seconds', 1)
+            self.registry.flush(force=True)
+            metrics.flush_at_exit()
+            self.assertEqual(self.registry.get(COUNTER), 0)
+        self.assertEqual(os.listdir(self.directory), [])
@@ -0,0 +1,89 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import skipIfDBFeature, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from recipes.models import Recipes
+from .utils import create_recipe, create_user
+
+RECIPES = 7
+
+
+class CursorPaginationTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user()
+        for _ in range(RECIPES):
+            create_recipe(cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, url, params=None):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def ids(self, page):
+        return [recipe['id'] for recipe in page['results']]
+
+    def test_pages_are_stable_across_inserts(self):
+        expected = list(Recipes.objects.order_by(
+            '-pub_date', '-id'
+        ).values_list('pk', flat=True))
+        page = self.get(reverse('recipes-list'), {'limit': 3, 'cursor': ''})
+        seen = self.ids(page)
+        while page['next']:
+            create_recipe(self.author)
+            page = self.get(page['next'])
+            seen += self.ids(page)
+        self.assertEqual(seen, expected)
+
+    def test_cursor_follows_ordering_ending_with_id(self):
+        page = self.get(reverse('recipes-list'), {
+            'limit': 4, 'cursor': '', 'ordering': 'pub_date'
+        })
+        seen = self.ids(page)
+        page = self.get(page['next'])
+        seen += self.ids(page)
+        self.assertEqual(seen, sorted(seen))
+        self.assertEqual(len(seen), RECIPES)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(
+            reverse('recipes-list'), {'cursor': 'не курсор'}
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_count_is_optional(self):
+        for params, count in (
+            ({}, None),
+            ({'count': 'exact'}, RECIPES),
+        ):
+            with self.subTest(**params):
+                page = self.get(
+                    reverse('recipes-list'), dict(params, cursor='')
+                )
+                self.assertEqual(page.get('count'), count)
+
+    @skipIfDBFeature('is_postgresql_10')
+    def test_approx_count_falls_back_to_exact(self):
+        page = self.get(reverse('recipes-list'), {
+            'cursor': '', 'count': 'approx'
+        })
+        self.assertEqual(page['count'], RECIPES)
+
+    @skipUnlessDBFeature('is_postgresql_10')
+    def test_approx_count_uses_planner_estimate(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {Recipes._meta.db_table}')
+        with CaptureQueriesContext(connection) as queries:
+            page = self.get(reverse('recipes-list'), {
+                'cursor': '', 'count': 'approx'
+            })
+        self.assertEqual(page['count'], RECIPES)
+        statements = [query['sql'] for query in queries]
+        self.assertTrue(statements[0].startswith('EXPLAIN (FORMAT JSON)'))
+        self.assertFalse(any('COUNT(' in sql for sql in statements))
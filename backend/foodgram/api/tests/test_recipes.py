@@ -0,0 +1,125 @@
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from recipes.models import Favorite, ListToBuy, Recipes, Subscript
+from .utils import create_ingredient, create_recipe, create_tag, create_user
+
+RECIPES = 8
+
+
+class RecipeListQueriesTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        author = create_user()
+        tags = [create_tag(), create_tag()]
+        ingredients = {create_ingredient(): 100, create_ingredient(): 5}
+        cls.recipes = [
+            create_recipe(author, tags, ingredients) for _ in range(RECIPES)
+        ]
+        Favorite.objects.create(user=cls.user, recipe=cls.recipes[0])
+        ListToBuy.objects.create(user=cls.user, recipe=cls.recipes[1])
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def get_list(self, limit):
+        response = self.client.get(reverse('recipes-list'), {'limit': limit})
+        self.assertEqual(response.status_code, 200)
+        return response.data['results']
+
+    def test_user_flags_do_not_depend_on_page_size(self):
+        # COUNT, страница рецептов с флагами, теги, ингредиенты.
+        for limit in (1, RECIPES):
+            cache.clear()
+            with self.assertNumQueries(4):
+                results = self.get_list(limit)
+            self.assertEqual(len(results), limit)
+
+    def test_user_flags(self):
+        flags = {
+            recipe['id']: (
+                recipe['is_favorited'], recipe['is_in_shopping_cart']
+            )
+            for recipe in self.get_list(RECIPES)
+        }
+        self.assertEqual(flags.pop(self.recipes[0].pk), (True, False))
+        self.assertEqual(flags.pop(self.recipes[1].pk), (False, True))
+        self.assertEqual(set(flags.values()), {(False, False)})
+
+
+class RecipeSerializationQueriesTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        cls.followed, other = create_user(), create_user()
+        Subscript.objects.create(user=cls.user, author=cls.followed)
+        tags = [create_tag(), create_tag()]
+        ingredients = {create_ingredient(): 1, create_ingredient(): 2}
+        for number in range(RECIPES):
+            create_recipe(
+                cls.followed if number % 2 else other, tags, ingredients
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def assert_authors(self, recipes):
+        for recipe in recipes:
+            self.assertEqual(
+                recipe['author']['is_subscribed'],
+                recipe['author']['id'] == self.followed.pk
+            )
+            self.assertEqual(len(recipe['tags']), 2)
+            self.assertEqual(len(recipe['ingredients']), 2)
+
+    def test_list(self):
+        for limit in (1, RECIPES):
+            cache.clear()
+            with self.assertNumQueries(4):
+                response = self.client.get(
+                    reverse('recipes-list'), {'limit': limit}
+                )
+            self.assertEqual(len(response.data['results']), limit)
+            self.assert_authors(response.data['results'])
+
+    def test_detail(self):
+        recipe = self.followed.recipes.first()
+        # Рецепт с автором и флагами, теги, ингредиенты.
+        with self.assertNumQueries(3):
+            response = self.client.get(
+                reverse('recipes-detail', args=[recipe.pk])
+            )
+        self.assert_authors([response.data])
+
+    def test_anonymous_detail(self):
+        recipe = self.followed.recipes.first()
+        self.client.force_authenticate(None)
+        with self.assertNumQueries(3):
+            response = self.client.get(
+                reverse('recipes-detail', args=[recipe.pk])
+            )
+        self.assertFalse(response.data['author']['is_subscribed'])
+
+
+class RecipeOrderingTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user()
+        cls.recipes = [create_recipe(author) for _ in range(3)]
+        Recipes.objects.update(pub_date=cls.recipes[0].pub_date)
+
+    def get_ids(self, ordering):
+        response = self.client.get(
+            reverse('recipes-list'), {'ordering': ordering}
+        )
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_tiebreaker_follows_ordering_direction(self):
+        ids = [recipe.pk for recipe in self.recipes]
+        self.assertEqual(self.get_ids('pub_date'), ids)
+        self.assertEqual(self.get_ids('-pub_date'), ids[::-1])
@@ -0,0 +1,74 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.checks import run_checks
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from .utils import create_tag
+
+
+class ReferenceCacheTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.tag = create_tag()
+
+    def setUp(self):
+        cache.clear()
+
+    def get_tags(self, **headers):
+        return self.client.get(reverse('tag-list'), **headers)
+
+    def test_disabled_by_default(self):
+        with self.assertNumQueries(1):
+            response = self.get_tags()
+        self.assertNotIn('ETag', response)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=300')
+        with self.assertNumQueries(1):
+            self.get_tags()
+
+    @override_settings(REFERENCE_CACHE=True)
+    def test_needs_shared_cache(self):
+        self.assertIn('api.E001', [error.id for error in run_checks()])
+        self.assertNotIn('ETag', self.get_tags())
+
+
+@override_settings(REFERENCE_CACHE=True)
+@mock.patch('api.cache.LOCAL_CACHE_BACKENDS', ())
+class SharedReferenceCacheTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.tag = create_tag()
+
+    def setUp(self):
+        cache.clear()
+
+    def get_tags(self, **headers):
+        return self.client.get(reverse('tag-list'), **headers)
+
+    def test_conditional_get(self):
+        etag = self.get_tags()['ETag']
+        with self.assertNumQueries(0):
+            response = self.get_tags(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        with self.assertNumQueries(0):
+            response = self.get_tags()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+
+    def test_every_edit_changes_etag(self):
+        etags = {self.get_tags()['ETag']}
+        for name in ('Завтрак', 'Обед'):
+            self.tag.name = name
+            self.tag.save()
+            response = self.get_tags(HTTP_IF_NONE_MATCH=' '.join(etags))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data[0]['name'], name)
+            etags.add(response['ETag'])
+        self.assertEqual(len(etags), 3)
+
+    def test_entries_expire(self):
+        with mock.patch.object(cache, 'set') as cache_set:
+            self.get_tags()
+        self.assertIsNotNone(cache_set.call_args[0][2])
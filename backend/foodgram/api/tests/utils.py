@@ -0,0 +1,43 @@
+from itertools import count
+
+from recipes.models import Ingredient, IngredientRecipe, Recipes, Tag, User
+
+numbers = count(1)
+
+
+def create_user(**fields):
+    number = next(numbers)
+    fields.setdefault('username', f'user{number}')
+    fields.setdefault('email', f'user{number}@example.com')
+    fields.setdefault('first_name', 'Имя')
+    fields.setdefault('last_name', 'Фамилия')
+    return User.objects.create(**fields)
+
+
+def create_tag():
+    number = next(numbers)
+    return Tag.objects.create(
+        name=f'Тег {number}', color=f'#{number:06d}', slug=f'tag{number}'
+    )
+
+
+def create_ingredient(name=None, measurement_unit='г'):
+    if name is None:
+        name = f'Ингредиент {next(numbers)}'
+    return Ingredient.objects.create(
+        name=name, measurement_unit=measurement_unit
+    )
+
+
+def create_recipe(author, tags=(), ingredients=None, **fields):
+    """ingredients: {ингредиент: количество}."""
+    fields.setdefault('name', f'Рецепт {next(numbers)}')
+    fields.setdefault('text', 'Описание')
+    fields.setdefault('cooking_time', 10)
+    recipe = Recipes.objects.create(author=author, **fields)
+    recipe.tags.set(tags)
+    IngredientRecipe.objects.bulk_create(
+        IngredientRecipe(recipe=recipe, ingredient=ingredient, amount=amount)
+        for ingredient, amount in (ingredients or {}).items()
+    )
+    return recipe
@@ -4,7 +4,8 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     TagViewSet,
     IngredientViewSet,
-    RecipesViewSet
+    RecipesViewSet,
+    metrics
 )
 from users.views import (
     CustomUserViewSet
@@ -19,4 +20,5 @@ router_v1.register('users', CustomUserViewSet)
 urlpatterns = [
     path('', include(router_v1.urls)),
     path('auth/', include('djoser.urls.authtoken')),
+    path('metrics', metrics, name='metrics'),
 ]
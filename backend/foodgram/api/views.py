@@ -1,16 +1,23 @@
-from django.db.models import Sum
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef, prefetch_related_objects
 from django.shortcuts import get_object_or_404
-from django.http import HttpResponse
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import JSONParser, MultiPartParser
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import filters
 
 from .serializers import (
+    RECIPE_PREFETCH,
     IngredientSerializer,
     TagSerializer,
     RecipesSerializer,
+    RecipesSubscriptSerializer,
+    RecipeIdsSerializer,
     FavoriteRecipesCreateSerializer,
     ListToBuyRecipesCreateSerializer,
     RecipesCreateSerializer
@@ -20,85 +27,281 @@ from .permissions import (
 )
 from recipes.models import (
     Tag, Ingredient, Recipes,
-    Favorite, ListToBuy, IngredientRecipe
+    Favorite, ListToBuy, Subscript, ListToBuyIngredient
 )
-from . mixins import ListRetrieveViewSet
-from .pagination import CustomPagination
-from .filters import RecipesFilter
+from recipes import counters, shopping_cart
+from recipes.locks import lock_users
+from .cache import recipe_feed_cache
+from .exceptions import toggle_error
+from .metrics import CONTENT_TYPE, registry
+from .mixins import ListRetrieveViewSet, ReferenceCacheMixin
+from .pagination import RecipesPagination
+from .filters import RecipesFilter, RecipesOrderingFilter
+from .renderers import SHOPPING_CART_RENDERERS
+from .search import INGREDIENT_SEARCH_LIMIT, IngredientSearchFilter
 
+SHOPPING_CART_CHUNK_SIZE = 2000
 
-class TagViewSet(ListRetrieveViewSet):
+
+def metrics(request):
+    if not settings.METRICS:
+        raise Http404
+    return HttpResponse(registry.render(), content_type=CONTENT_TYPE)
+
+
+class TagViewSet(ReferenceCacheMixin, ListRetrieveViewSet):
     queryset = Tag.objects.all().order_by('slug')
     serializer_class = TagSerializer
 
 
-class IngredientViewSet(ListRetrieveViewSet):
+class IngredientViewSet(ReferenceCacheMixin, ListRetrieveViewSet):
     queryset = Ingredient.objects.all().order_by('pk')
     serializer_class = IngredientSerializer
-    filter_backends = (filters.SearchFilter,)
-    search_fields = ('^name',)
+    filter_backends = (IngredientSearchFilter,)
+    search_limit = INGREDIENT_SEARCH_LIMIT
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action == 'list' and self.request.query_params.get(
+            IngredientSearchFilter.search_param, ''
+        ).strip():
+            return queryset[:self.search_limit]
+        return queryset
 
 
 class RecipesViewSet(viewsets.ModelViewSet):
-    queryset = Recipes.objects.all().order_by('-pub_date')
+    queryset = Recipes.objects.all().order_by('-pub_date', '-id')
     serializer_class = RecipesSerializer
-    pagination_class = CustomPagination
+    pagination_class = RecipesPagination
     permission_classes = (AuthorOrReadOnly,)
-    filter_backends = (DjangoFilterBackend,)
+    parser_classes = (JSONParser, MultiPartParser)
+    filter_backends = (DjangoFilterBackend, RecipesOrderingFilter)
     filterset_class = RecipesFilter
+    ordering_fields = ('pub_date', 'favorites_count', 'in_carts_count')
+
+    recipe_prefetch = RECIPE_PREFETCH
+
+    def get_queryset(self):
+        queryset = super().get_queryset().select_related('author')
+        if self.action != 'list':
+            queryset = queryset.prefetch_related(*self.recipe_prefetch)
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset
+        return queryset.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                recipe=OuterRef('pk'), user=user
+            )),
+            is_in_shopping_cart=Exists(ListToBuy.objects.filter(
+                recipe=OuterRef('pk'), user=user
+            )),
+            author_is_subscribed=Exists(Subscript.objects.filter(
+                author=OuterRef('author'), user=user
+            )),
+        )
 
     def get_serializer_class(self):
         if self.action in ('list', 'retrieve'):
             return RecipesSerializer
         return RecipesCreateSerializer
 
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(
+            self.filter_queryset(self.get_queryset())
+        )
+        bodies = recipe_feed_cache.get_many(page)
+        misses = [recipe for recipe in page if recipe.pk not in bodies]
+        if misses:
+            prefetch_related_objects(misses, *self.recipe_prefetch)
+            serializer = self.get_serializer(misses, many=True)
+            for recipe, data in zip(misses, serializer.data):
+                bodies[recipe.pk] = recipe_feed_cache.make_shared(
+                    recipe, data
+                )
+            recipe_feed_cache.set_many(misses, bodies)
+        return self.get_paginated_response([
+            recipe_feed_cache.overlay(
+                bodies[recipe.pk],
+                RecipesSerializer.Meta.fields,
+                request,
+                is_favorited=getattr(recipe, 'is_favorited', False),
+                is_in_shopping_cart=getattr(
+                    recipe, 'is_in_shopping_cart', False
+                ),
+                is_subscribed=getattr(recipe, 'author_is_subscribed', False)
+            )
+            for recipe in page
+        ])
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        shopping_cart.change_recipe(
+            instance.pk, shopping_cart.recipe_amounts(instance.pk), {}
+        )
+        instance.delete()
+
     def create_delete(
-        self, request, pk, model, getserializer
+        self, request, pk, model, getserializer, counter
     ):
-        data = {}
-        data['recipe'] = get_object_or_404(Recipes, pk=pk).pk
-        data['user'] = self.request.user.pk
-        serializer = getserializer(
-            context={'request': request}, data=data
-        )
-        serializer.is_valid(raise_exception=True)
+        recipe = get_object_or_404(Recipes, pk=pk)
         if request.method == "POST":
-            serializer.save()
+            try:
+                with transaction.atomic():
+                    instance = model.objects.create(
+                        user=request.user, recipe=recipe
+                    )
+            except IntegrityError:
+                raise toggle_error(getserializer.exists_message)
+            counters.change(recipe.pk, counter, 1)
             return Response(
-                serializer.data, status=status.HTTP_201_CREATED
+                getserializer(instance, context={'request': request}).data,
+                status=status.HTTP_201_CREATED
             )
-        model.objects.filter(**data).delete()
+        deleted, _ = model.objects.filter(
+            user=request.user, recipe=recipe
+        ).delete()
+        if not deleted:
+            raise toggle_error(getserializer.missing_message)
+        counters.change(recipe.pk, counter, -deleted)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    def create_many(self, request, recipes, model, counter):
+        lock_users([request.user.pk])
+        existing = set(model.objects.filter(
+            user=request.user, recipe__in=recipes
+        ).order_by().values_list('recipe_id', flat=True))
+        created = [
+            recipe.pk for recipe in recipes if recipe.pk not in existing
+        ]
+        model.objects.bulk_create(
+            (model(user=request.user, recipe_id=pk) for pk in created),
+            ignore_conflicts=True
+        )
+        counters.change_many(created, counter, 1)
+        return created
+
+    def delete_many(self, request, recipes, model, counter):
+        deleted = list(model.objects.select_for_update().filter(
+            user=request.user, recipe__in=recipes
+        ).values_list('recipe_id', flat=True))
+        if deleted:
+            model.objects.filter(
+                user=request.user, recipe__in=deleted
+            ).delete()
+        counters.change_many(deleted, counter, -1)
+        return deleted
+
+    def create_delete_many(self, request, model, counter):
+        """Добавляет или убирает сразу несколько рецептов из {"ids": [...]}.
+
+        В отличие от запросов по одному рецепту, уже добавленные
+        (или уже убранные) рецепты не считаются ошибкой.
+        """
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipes = serializer.validated_data['ids']
+        if request.method == "POST":
+            created = self.create_many(request, recipes, model, counter)
+            return created, Response(
+                RecipesSubscriptSerializer(recipes, many=True).data,
+                status=status.HTTP_201_CREATED
+            )
+        deleted = self.delete_many(request, recipes, model, counter)
+        return deleted, Response(status=status.HTTP_204_NO_CONTENT)
+
     @action(detail=True, methods=['post', 'delete'])
+    @transaction.atomic
     def favorite(self, request, pk):
         return self.create_delete(
-            request, pk, Favorite, FavoriteRecipesCreateSerializer
+            request, pk, Favorite, FavoriteRecipesCreateSerializer,
+            'favorites_count'
         )
 
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        url_path='favorite',
+        url_name='favorite-batch',
+        permission_classes=(IsAuthenticated,)
+    )
+    @transaction.atomic
+    def favorite_batch(self, request):
+        _, response = self.create_delete_many(
+            request, Favorite, 'favorites_count'
+        )
+        return response
+
     @action(detail=True, methods=['post', 'delete'])
+    @transaction.atomic
     def shopping_cart(self, request, pk):
-        return self.create_delete(
-            request, pk, ListToBuy, ListToBuyRecipesCreateSerializer
+        response = self.create_delete(
+            request, pk, ListToBuy, ListToBuyRecipesCreateSerializer,
+            'in_carts_count'
+        )
+        if response.status_code == status.HTTP_201_CREATED:
+            shopping_cart.add_recipe(request.user.pk, pk)
+        else:
+            shopping_cart.remove_recipe(request.user.pk, pk)
+        return response
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        url_path='shopping_cart',
+        url_name='shopping-cart-batch',
+        permission_classes=(IsAuthenticated,)
+    )
+    @transaction.atomic
+    def shopping_cart_batch(self, request):
+        changed, response = self.create_delete_many(
+            request, ListToBuy, 'in_carts_count'
         )
+        if response.status_code == status.HTTP_201_CREATED:
+            shopping_cart.add_recipes(request.user.pk, changed)
+        else:
+            shopping_cart.remove_recipes(request.user.pk, changed)
+        return response
 
-    @action(detail=False)
+    @action(detail=False, permission_classes=(IsAuthenticated,))
+    def shopping_cart_total(self, request):
+        return Response({
+            'recipes': request.user.listtobuy.count(),
+            'ingredients': request.user.listtobuy_ingredients.count(),
+        })
+
+    def get_servings(self):
+        servings = self.request.query_params.get('servings', '1')
+        if not servings.isdigit() or int(servings) < 1:
+            raise ValidationError(
+                {'servings': 'Укажите целое число порций больше 0'}
+            )
+        return int(servings)
+
+    @action(
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+        renderer_classes=SHOPPING_CART_RENDERERS
+    )
     def download_shopping_cart(self, request):
-        ingredient_list = IngredientRecipe.objects.filter(
-            recipe__listtobuy__user=request.user
-        ).order_by('ingredient__name').values(
-            'ingredient__name', 'ingredient__measurement_unit'
-        ).annotate(amount_total=Sum('amount'))
-        to_buy = []
-        for ingredient in ingredient_list:
-            name = ingredient['ingredient__name']
-            unit = ingredient['ingredient__measurement_unit']
-            amount = ingredient['amount_total']
-            to_buy.append(f'{name} ({unit}) - {amount} \n')
-        response = HttpResponse(content_type='text/plain')
-        response["Content-Disposition"] = "attachment; filename=shop-list.txt"
-        response.writelines(to_buy)
+        servings = self.get_servings()
+        ingredient_list = ListToBuyIngredient.objects.filter(
+            user=request.user
+        ).order_by('ingredient__name').values_list(
+            'ingredient__name', 'ingredient__measurement_unit', 'amount'
+        ).iterator(chunk_size=SHOPPING_CART_CHUNK_SIZE)
+        to_buy = (
+            (name, unit, amount * servings)
+            for name, unit, amount in ingredient_list
+        )
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.stream(to_buy),
+            content_type=f'{renderer.media_type}; charset={renderer.charset}'
+        )
+        response["Content-Disposition"] = (
+            f"attachment; filename=shop-list.{renderer.format}"
+        )
         return response
@@ -0,0 +1,159 @@
+import os
+import time
+from threading import BoundedSemaphore, Lock
+
+import psycopg2
+from django.conf import settings
+from django.db.backends.postgresql import base, creation
+from psycopg2.pool import PoolError, ThreadedConnectionPool
+
+from .signals import pool_connection_acquired, pool_connection_created
+
+pools = {}
+pools_lock = Lock()
+
+
+class BlockingConnectionPool(ThreadedConnectionPool):
+    """Пул psycopg2, который ждёт свободное соединение до timeout секунд
+    вместо PoolError и при health checks отбрасывает разорванные соединения.
+    """
+
+    def __init__(self, alias, minconn, maxconn, timeout, **kwargs):
+        self.alias = alias
+        self.database = kwargs.get('database')
+        self.pid = os.getpid()
+        self.timeout = timeout
+        self.slots = BoundedSemaphore(maxconn)
+        self.fresh = set()
+        super().__init__(minconn, maxconn, **kwargs)
+
+    def _connect(self, key=None):
+        connection = super()._connect(key)
+        connection.autocommit = True
+        self.fresh.add(id(connection))
+        pool_connection_created.send(sender=type(self), alias=self.alias)
+        return connection
+
+    def getconn(self, key=None):
+        started = time.perf_counter()
+        acquired = self.slots.acquire(timeout=self.timeout)
+        pool_connection_acquired.send(
+            sender=type(self), alias=self.alias,
+            wait=time.perf_counter() - started
+        )
+        if not acquired:
+            raise PoolError(
+                f'Нет свободных соединений с БД за {self.timeout} с'
+            )
+        try:
+            return self.get_usable()
+        except Exception:
+            self.slots.release()
+            raise
+
+    def is_usable(self, connection):
+        if id(connection) in self.fresh:
+            self.fresh.discard(id(connection))
+            return True
+        if not settings.DB_CONN_HEALTH_CHECKS:
+            return True
+        try:
+            connection.cursor().execute('SELECT 1')
+        except psycopg2.Error:
+            return False
+        return True
+
+    def get_usable(self):
+        for _ in range(self.maxconn):
+            connection = super().getconn()
+            if self.is_usable(connection):
+                return connection
+            super().putconn(connection, close=True)
+        return super().getconn()
+
+    def putconn(self, connection, close=False):
+        try:
+            if self.closed:
+                connection.close()
+            else:
+                super().putconn(connection, close=close)
+        finally:
+            self.slots.release()
+
+    def gauges(self):
+        labels = {'alias': self.alias}
+        return [
+            ('foodgram_db_pool_connections', dict(labels, state='idle'),
+             len(self._pool)),
+            ('foodgram_db_pool_connections', dict(labels, state='used'),
+             len(self._used)),
+            ('foodgram_db_pool_size_max', labels, self.maxconn),
+        ]
+
+
+def close_pools(database):
+    with pools_lock:
+        for key, pool in list(pools.items()):
+            if pool.database == database:
+                del pools[key]
+                if pool.pid == os.getpid():
+                    pool.closeall()
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        close_pools(test_database_name)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL с пулом соединений внутри процесса.
+
+    Закрытие соединения возвращает его в пул, поэтому при CONN_MAX_AGE = 0
+    каждый запрос берёт уже открытое соединение. Отдельный пул заводится
+    на каждый набор параметров подключения, размеры задаются
+    в DATABASES[...]['POOL'].
+    """
+    creation_class = DatabaseCreation
+    pooled = True
+
+    def get_pool(self, conn_params):
+        key = (self.alias, repr(sorted(conn_params.items())))
+        with pools_lock:
+            pool = pools.get(key)
+            if pool is not None and pool.pid == os.getpid():
+                return pool
+            options = self.settings_dict.get('POOL', {})
+            pools[key] = BlockingConnectionPool(
+                self.alias,
+                options.get('MIN_SIZE', 1),
+                options.get('MAX_SIZE', 10),
+                options.get('TIMEOUT', 10),
+                **conn_params
+            )
+            return pools[key]
+
+    def get_new_connection(self, conn_params):
+        self.pool = self.get_pool(conn_params)
+        connection = self.pool.getconn()
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.putconn(self.connection, close=self.errors_occurred)
+
+    def pool_gauges(self):
+        return [
+            gauge for pool in list(pools.values())
+            if pool.alias == self.alias and pool.pid == os.getpid()
+            for gauge in pool.gauges()
+        ]
@@ -0,0 +1,8 @@
+from django.dispatch import Signal
+
+# Пул открыл новое соединение с БД. Аргументы: alias.
+pool_connection_created = Signal()
+
+# Запрос получил соединение из пула. Аргументы: alias, wait — сколько
+# секунд он ждал свободного соединения.
+pool_connection_acquired = Signal()
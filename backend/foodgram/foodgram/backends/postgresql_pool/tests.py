@@ -0,0 +1,96 @@
+import time
+
+from django.db import Error, connection
+from django.test import TransactionTestCase, override_settings
+
+from .base import DatabaseWrapper, pools, pools_lock
+from .signals import pool_connection_acquired, pool_connection_created
+
+ALIAS = 'pool-test'
+
+
+def close_test_pools():
+    with pools_lock:
+        for key, pool in list(pools.items()):
+            if pool.alias == ALIAS:
+                del pools[key]
+                pool.closeall()
+
+
+class PooledConnectionTest(TransactionTestCase):
+    """Пул на настоящем PostgreSQL: CI гоняет тесты на сервисе postgres."""
+
+    def setUp(self):
+        if connection.vendor != 'postgresql':
+            self.skipTest('Пулу нужен PostgreSQL')
+        self.created, self.waits = [], []
+        for signal, received in (
+            (pool_connection_created, self.created),
+            (pool_connection_acquired, self.waits),
+        ):
+            def receive(received=received, **kwargs):
+                received.append(kwargs)
+            signal.connect(receive, weak=False, dispatch_uid=id(received))
+            self.addCleanup(signal.disconnect, dispatch_uid=id(received))
+        self.addCleanup(close_test_pools)
+
+    def wrapper(self):
+        settings_dict = dict(
+            connection.settings_dict,
+            ENGINE='foodgram.backends.postgresql_pool',
+            POOL={'MIN_SIZE': 1, 'MAX_SIZE': 2, 'TIMEOUT': 0.1}
+        )
+        wrapper = DatabaseWrapper(settings_dict, ALIAS)
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def backend_pid(self, wrapper):
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT pg_backend_pid()')
+            return cursor.fetchone()[0]
+
+    def test_close_returns_connection_to_pool(self):
+        wrapper = self.wrapper()
+        pid = self.backend_pid(wrapper)
+        wrapper.close()
+        self.assertEqual(self.backend_pid(wrapper), pid)
+        self.assertEqual(len(self.created), 1)
+        self.assertEqual(len(self.waits), 2)
+        self.assertEqual(self.created[0]['alias'], ALIAS)
+
+    def test_checkout_waits_for_free_connection(self):
+        first, second, third = self.wrapper(), self.wrapper(), self.wrapper()
+        self.backend_pid(first)
+        self.backend_pid(second)
+        with self.assertRaises(Error):
+            self.backend_pid(third)
+        self.assertGreaterEqual(self.waits[-1]['wait'], 0.1)
+        first.close()
+        self.backend_pid(third)
+
+    def test_gauges(self):
+        wrapper = self.wrapper()
+        self.backend_pid(wrapper)
+        gauges = {
+            (name, labels.get('state')): value
+            for name, labels, value in wrapper.pool_gauges()
+        }
+        self.assertEqual(gauges[('foodgram_db_pool_connections', 'used')], 1)
+        self.assertEqual(gauges[('foodgram_db_pool_size_max', None)], 2)
+
+    @override_settings(DB_CONN_HEALTH_CHECKS=True)
+    def test_health_check_replaces_dropped_connection(self):
+        wrapper = self.wrapper()
+        pid = self.backend_pid(wrapper)
+        wrapper.close()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_terminate_backend(%s)', [pid])
+            for _ in range(50):
+                cursor.execute(
+                    'SELECT 1 FROM pg_stat_activity WHERE pid = %s', [pid]
+                )
+                if cursor.fetchone() is None:
+                    break
+                time.sleep(0.1)
+        self.assertNotEqual(self.backend_pid(wrapper), pid)
+        self.assertEqual(len(self.created), 2)
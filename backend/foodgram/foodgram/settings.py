@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 from dotenv import load_dotenv
 from django.core.management.utils import get_random_secret_key
@@ -30,6 +31,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',
+    'api.middleware.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -68,10 +71,118 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER', default='postgres'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', default='postgres'),
         'HOST': os.getenv('DB_HOST', default='db'),
-        'PORT': os.getenv('DB_PORT', default=5432)
+        'PORT': os.getenv('DB_PORT', default=5432),
+        # Seconds a connection is reused across requests; 0 closes it after
+        # each request. With the pooled engine
+        # foodgram.backends.postgresql_pool keep it at 0 so that connections
+        # go back to the pool when a request ends.
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', default=60)),
+        # Used only by foodgram.backends.postgresql_pool. Up to MIN_SIZE
+        # idle connections are kept open (match GUNICORN_THREADS), at most
+        # MAX_SIZE are open at once, and a request waits up to TIMEOUT
+        # seconds for a free one.
+        'POOL': {
+            'MIN_SIZE': int(os.getenv('DB_POOL_MIN_SIZE', default=4)),
+            'MAX_SIZE': int(os.getenv('DB_POOL_MAX_SIZE', default=10)),
+            'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', default=10)),
+        },
+    }
+}
+
+# Run SELECT 1 on a reused connection before a request uses it and
+# reconnect if the database dropped it, instead of failing that request.
+# Off by default: the check costs a round trip on every request.
+DB_CONN_HEALTH_CHECKS = (
+    os.getenv('DB_CONN_HEALTH_CHECKS', default='False') == 'True'
+)
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default=''),
     }
 }
 
+# Cache /api/tags/ and /api/ingredients/ responses and answer conditional
+# GETs by ETag. Needs a CACHE_BACKEND shared by all workers, otherwise
+# other workers keep serving old data after an edit (check api.E001).
+REFERENCE_CACHE = os.getenv('REFERENCE_CACHE') == 'True'
+
+# How long a cached tags or ingredients response is kept, in seconds.
+REFERENCE_CACHE_TIMEOUT = int(
+    os.getenv('REFERENCE_CACHE_TIMEOUT', default=60 * 60)
+)
+
+# Serve /api/ingredients/ from an in-process index in every worker.
+# Invalidation across workers needs a shared CACHE_BACKEND.
+INGREDIENT_INDEX_CACHE = os.getenv('INGREDIENT_INDEX_CACHE') == 'True'
+
+# Cache the user-independent part of serialized recipes in the feed.
+# Needs a CACHE_BACKEND shared by all workers, otherwise other workers
+# keep serving old tag, ingredient and author data (check api.E002).
+RECIPE_FEED_CACHE = os.getenv('RECIPE_FEED_CACHE') == 'True'
+
+# How long a serialized recipe stays in the feed cache, in seconds.
+RECIPE_FEED_CACHE_TIMEOUT = int(
+    os.getenv('RECIPE_FEED_CACHE_TIMEOUT', default=60 * 60 * 24)
+)
+
+# Largest accepted recipe image after base64 decoding, in bytes.
+RECIPE_IMAGE_MAX_SIZE = int(
+    os.getenv('RECIPE_IMAGE_MAX_SIZE', default=10 * 1024 * 1024)
+)
+
+# Threads per process building WebP variants of recipe images.
+# 0 builds them inline right after the request's transaction commits.
+RECIPE_IMAGE_WORKERS = int(os.getenv('RECIPE_IMAGE_WORKERS', default=2))
+
+# Report SQL, view and render time of each request in Server-Timing
+# headers and the api.middleware log. When off the middleware unloads
+# itself at startup and costs nothing.
+REQUEST_TIMING = os.getenv('REQUEST_TIMING') == 'True'
+
+# Identical queries repeated this many times within one request are
+# logged as a likely N+1.
+REQUEST_TIMING_REPEATED_QUERIES = int(
+    os.getenv('REQUEST_TIMING_REPEATED_QUERIES', default=5)
+)
+
+# Collect request, SQL and cache metrics and serve them at /api/metrics.
+# The endpoint has no authentication: enable it only where the proxy
+# denies /api/metrics and the scraper talks to the backend directly.
+METRICS = os.getenv('METRICS', default='False') == 'True'
+
+# Every worker process writes its metrics here and /api/metrics adds them
+# up, so all gunicorn workers of one instance must share the directory.
+# Empty keeps metrics local to the process that serves the scrape.
+METRICS_DIR = os.getenv(
+    'METRICS_DIR',
+    default=os.path.join(tempfile.gettempdir(), 'foodgram-metrics')
+)
+
+# How often a worker rewrites its metrics file, in seconds.
+METRICS_FLUSH_INTERVAL = float(
+    os.getenv('METRICS_FLUSH_INTERVAL', default=5)
+)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api.middleware': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
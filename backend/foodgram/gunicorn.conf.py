@@ -0,0 +1,10 @@
+# gunicorn reads this file from its working directory on start (the
+# Dockerfile runs it from /app), so these settings apply to production
+# without extra command line options.
+import os
+
+# Threaded workers keep serving other requests while one waits on the
+# database. Each thread holds its own database connection.
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', default='gthread')
+workers = int(os.getenv('GUNICORN_WORKERS', default=1))
+threads = int(os.getenv('GUNICORN_THREADS', default=4))
@@ -3,7 +3,7 @@ from django.contrib.auth.admin import UserAdmin
 
 from .models import (
     Tag, Ingredient, Recipes, IngredientRecipe,
-    Favorite, ListToBuy, User, Subscript
+    Favorite, ListToBuy, User, Subscript, ListToBuyIngredient, RecipeRank
 )
 
 
@@ -132,7 +132,7 @@ class IngredientRecipeAdminConfig(PermissionsAdmin):
 
 
 class RecipesAdmin(PermissionsAdmin):
-    list_display = ('pk', 'name', 'author')
+    list_display = ('pk', 'name', 'author', 'fav_count', 'in_carts_count')
     list_filter = ('tags', 'name', 'author')
     readonly_fields = ('fav_count', 'pub_date')
     fieldsets = (
@@ -153,11 +153,14 @@ class RecipesAdmin(PermissionsAdmin):
         )
 
     def fav_count(self, obj):
-        return obj.favorite.all().count()
+        return obj.favorites_count
     fav_count.short_description = 'Кол-во добавлений в избранное'
+    fav_count.admin_order_field = 'favorites_count'
 
 
 admin.site.register(Recipes, RecipesAdmin)
 admin.site.register(Favorite, PermissionsAdmin)
 admin.site.register(ListToBuy, PermissionsAdmin)
 admin.site.register(Subscript, PermissionsAdmin)
+admin.site.register(ListToBuyIngredient, PermissionsAdmin)
+admin.site.register(RecipeRank, PermissionsAdmin)
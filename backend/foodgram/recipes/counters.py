@@ -0,0 +1,59 @@
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Favorite, ListToBuy, Recipes
+
+COUNTERS = {
+    'favorites_count': Favorite,
+    'in_carts_count': ListToBuy,
+}
+
+
+def change(recipe_id, counter, delta):
+    change_many([recipe_id], counter, delta)
+
+
+def change_many(recipe_ids, counter, delta):
+    if recipe_ids and delta:
+        Recipes.objects.filter(pk__in=recipe_ids).update(
+            **{counter: F(counter) + delta}
+        )
+
+
+def expected_count(model):
+    return Coalesce(Subquery(
+        model.objects.filter(
+            recipe=OuterRef('pk')
+        ).order_by().values('recipe').annotate(
+            total=Count('pk')
+        ).values('total'),
+        output_field=IntegerField()
+    ), 0)
+
+
+def find_mismatches(recipe_ids=None):
+    queryset = Recipes.objects.all()
+    if recipe_ids is not None:
+        queryset = queryset.filter(pk__in=recipe_ids)
+    queryset = queryset.annotate(**{
+        f'expected_{counter}': expected_count(model)
+        for counter, model in COUNTERS.items()
+    }).exclude(**{
+        counter: F(f'expected_{counter}') for counter in COUNTERS
+    })
+    fields = ['pk']
+    for counter in COUNTERS:
+        fields += [counter, f'expected_{counter}']
+    return list(queryset.order_by('pk').values_list(*fields))
+
+
+def recount(recipe_ids=None):
+    with transaction.atomic():
+        queryset = Recipes.objects.all()
+        if recipe_ids is not None:
+            queryset = queryset.filter(pk__in=recipe_ids)
+        queryset.update(**{
+            counter: expected_count(model)
+            for counter, model in COUNTERS.items()
+        })
@@ -0,0 +1,118 @@
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from threading import Lock
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .models import Recipes
+
+VARIANTS = {
+    'thumbnail': (160, 160),
+    'card': (480, 480),
+    'full': (1280, 1280),
+}
+WEBP_QUALITY = 80
+
+logger = logging.getLogger(__name__)
+executor_lock = Lock()
+
+
+def variant_name(name, variant):
+    return f'{os.path.splitext(name)[0]}.{variant}.webp'
+
+
+def variant_urls(recipe):
+    if not recipe.image or not recipe.image_variants_ready:
+        return None
+    storage = recipe.image.storage
+    return {
+        variant: storage.url(variant_name(recipe.image.name, variant))
+        for variant in VARIANTS
+    }
+
+
+def encode_variant(image, size):
+    variant = image.copy()
+    variant.thumbnail(size, Image.LANCZOS)
+    buffer = io.BytesIO()
+    variant.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=4)
+    return buffer.getvalue()
+
+
+def make_variants(recipe_id, name):
+    recipe = Recipes.objects.filter(pk=recipe_id, image=name).first()
+    if recipe is None:
+        return
+    storage = recipe.image.storage
+    missing = {
+        variant: variant_name(name, variant) for variant in VARIANTS
+        if not storage.exists(variant_name(name, variant))
+    }
+    if missing:
+        with storage.open(name) as file:
+            image = ImageOps.exif_transpose(Image.open(file))
+            image = image.convert(
+                'RGBA' if 'A' in image.getbands() else 'RGB'
+            )
+        for variant, path in missing.items():
+            storage.save_derived(
+                path, ContentFile(encode_variant(image, VARIANTS[variant]))
+            )
+    Recipes.objects.filter(pk=recipe_id, image=name).update(
+        image_variants_ready=True, updated_at=timezone.now()
+    )
+
+
+def try_make_variants(recipe_id, name):
+    try:
+        make_variants(recipe_id, name)
+    except Exception:
+        logger.exception('Не удалось подготовить картинки рецепта %s',
+                         recipe_id)
+        return False
+    return True
+
+
+def run_make_variants(recipe_id, name):
+    try:
+        try_make_variants(recipe_id, name)
+    finally:
+        connection.close()
+
+
+@lru_cache(maxsize=None)
+def create_executor():
+    return ThreadPoolExecutor(
+        max_workers=settings.RECIPE_IMAGE_WORKERS,
+        thread_name_prefix='recipe-images'
+    )
+
+
+def get_executor():
+    with executor_lock:
+        return create_executor()
+
+
+def schedule_variants(recipe):
+    """Готовит уменьшенные копии картинки в WebP после коммита транзакции:
+    в пуле потоков или сразу, если RECIPE_IMAGE_WORKERS = 0.
+
+    Задачи пула теряются при перезапуске процесса; оставшиеся без копий
+    рецепты догоняет команда make_image_variants.
+    """
+    if not recipe.image:
+        return
+    recipe_id, name = recipe.pk, recipe.image.name
+    if not settings.RECIPE_IMAGE_WORKERS:
+        transaction.on_commit(lambda: try_make_variants(recipe_id, name))
+        return
+    transaction.on_commit(
+        lambda: get_executor().submit(run_make_variants, recipe_id, name)
+    )
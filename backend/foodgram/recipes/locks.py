@@ -0,0 +1,13 @@
+from .models import User
+
+
+def lock_users(user_ids):
+    """Блокирует строки пользователей до конца транзакции.
+
+    Строки, которых ещё нет, заблокировать нельзя, поэтому изменения
+    списков одного пользователя идут по очереди через блокировку его
+    строки в User, иначе две транзакции вставят одну и ту же строку.
+    """
+    list(User.objects.select_for_update().filter(
+        pk__in=user_ids
+    ).order_by('pk').values_list('pk', flat=True))
@@ -0,0 +1,72 @@
+import os
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.utils import timezone
+
+from recipes.images import VARIANTS, variant_name
+from recipes.models import Recipes
+from recipes.storage import recipe_image_storage
+
+
+def walk(storage, path):
+    directories, files = storage.listdir(path)
+    for name in files:
+        yield os.path.join(path, name)
+    for directory in directories:
+        yield from walk(storage, os.path.join(path, directory))
+
+
+class Command(BaseCommand):
+    help = ('Удаляет картинки рецептов и их уменьшенные копии, на которые '
+            'не ссылается ни один рецепт')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age', type=int, default=24,
+            help='Не трогать файлы моложе указанного числа часов: они '
+                 'могут принадлежать ещё не сохранённому рецепту'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что будет удалено'
+        )
+
+    def get_references(self):
+        references = {}
+        for name, count in Recipes.objects.exclude(image='').values_list(
+            'image'
+        ).annotate(refs=Count('pk')).order_by():
+            references[name] = count
+            for variant in VARIANTS:
+                references[variant_name(name, variant)] = count
+        return references
+
+    def handle(self, *args, **options):
+        storage = recipe_image_storage
+        directory = Recipes._meta.get_field('image').upload_to
+        if not storage.exists(directory):
+            return
+        references = self.get_references()
+        deadline = timezone.now() - timedelta(hours=options['min_age'])
+        total = shared = removed = freed = 0
+        for name in walk(storage, directory.rstrip('/')):
+            total += 1
+            if references.get(name, 0) > 1:
+                shared += 1
+            if name in references or storage.get_modified_time(
+                name
+            ) > deadline:
+                continue
+            removed += 1
+            freed += storage.size(name)
+            if options['dry_run']:
+                self.stdout.write(name)
+            else:
+                storage.delete(name)
+        self.stdout.write(self.style.SUCCESS(
+            f'Файлов: {total}, общих для нескольких рецептов: {shared}, '
+            f'{"к удалению" if options["dry_run"] else "удалено"}: '
+            f'{removed} ({freed / (1024 * 1024):.1f} МБ)'
+        ))
@@ -0,0 +1,173 @@
+import csv
+import io
+import json
+import os
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from recipes.models import Ingredient
+from recipes.table_versions import bump_table_version
+
+NAME_LENGTH = Ingredient._meta.get_field('name').max_length
+UNIT_LENGTH = Ingredient._meta.get_field('measurement_unit').max_length
+READ_SIZE = 1 << 16
+
+
+def read_csv(file):
+    for row in csv.reader(file):
+        if len(row) >= 2:
+            yield row[0], row[1]
+
+
+def read_json(file):
+    decoder = json.JSONDecoder()
+    buffer = ''
+    while True:
+        chunk = file.read(READ_SIZE)
+        buffer += chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,[]':
+                position += 1
+            if position == len(buffer):
+                break
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if not chunk:
+                    raise
+                break
+            yield item['name'], item['measurement_unit']
+        buffer = buffer[position:]
+        if not chunk:
+            return
+
+
+READERS = {'csv': read_csv, 'json': read_json}
+
+
+class Command(BaseCommand):
+    help = 'Загружает ингредиенты из data/ingredients.csv или .json'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=READERS)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--upsert', action='store_true',
+            help='Обновлять единицы измерения у ингредиентов с тем же '
+                 'названием вместо добавления новых записей'
+        )
+        parser.add_argument(
+            '--copy', action='store_true',
+            help='Загружать пачки через COPY (только PostgreSQL)'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только прочитать файл, ничего не записывая'
+        )
+
+    def get_save(self, options):
+        if options['copy'] and connection.vendor != 'postgresql':
+            raise CommandError('--copy поддерживается только в PostgreSQL')
+        if options['dry_run']:
+            return None
+        if options['upsert']:
+            return self.save_upsert
+        if options['copy']:
+            return self.save_copy
+        return self.save_insert
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or os.path.splitext(path)[1][1:]
+        if file_format not in READERS:
+            raise CommandError(f'Неизвестный формат файла: {path}')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше 0')
+        save = self.get_save(options)
+        started = time.perf_counter()
+        before = Ingredient.objects.count()
+        read = skipped = self.updated = 0
+        with open(path, encoding='utf-8', newline='') as file:
+            rows = READERS[file_format](file)
+            while True:
+                batch = list(islice(rows, options['batch_size']))
+                if not batch:
+                    break
+                read += len(batch)
+                unique = self.clean(batch)
+                skipped += len(batch) - len(unique)
+                if save is not None:
+                    with transaction.atomic():
+                        save(unique)
+        if save is not None:
+            bump_table_version(Ingredient)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Прочитано {read}, пропущено {skipped}, '
+            f'добавлено {Ingredient.objects.count() - before}, '
+            f'обновлено {self.updated} '
+            f'за {elapsed:.2f} с ({read / elapsed:.0f} строк/с)'
+        ))
+
+    def clean(self, batch):
+        unique = {}
+        for name, unit in batch:
+            name, unit = name.strip(), unit.strip()
+            if (
+                name and unit
+                and len(name) <= NAME_LENGTH and len(unit) <= UNIT_LENGTH
+            ):
+                unique.setdefault((name, unit))
+        return list(unique)
+
+    def save_insert(self, rows):
+        Ingredient.objects.bulk_create(
+            (Ingredient(name=name, measurement_unit=unit)
+             for name, unit in rows),
+            ignore_conflicts=True
+        )
+
+    def save_copy(self, rows):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        table = Ingredient._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMP TABLE IF NOT EXISTS ingredient_import '
+                '(name text, measurement_unit text) ON COMMIT DELETE ROWS'
+            )
+            cursor.cursor.copy_expert(
+                'COPY ingredient_import (name, measurement_unit) '
+                'FROM STDIN WITH CSV', buffer
+            )
+            cursor.execute(
+                f'INSERT INTO {table} (name, measurement_unit) '
+                'SELECT name, measurement_unit FROM ingredient_import '
+                'ON CONFLICT DO NOTHING'
+            )
+
+    def save_upsert(self, rows):
+        existing = {}
+        for ingredient in Ingredient.objects.filter(
+            name__in={name for name, _ in rows}
+        ):
+            existing.setdefault(ingredient.name, []).append(ingredient)
+        to_create, to_update = [], []
+        for name, unit in rows:
+            found = existing.get(name, [])
+            if any(item.measurement_unit == unit for item in found):
+                continue
+            if len(found) == 1 and found[0] not in to_update:
+                found[0].measurement_unit = unit
+                to_update.append(found[0])
+            else:
+                to_create.append(Ingredient(name=name, measurement_unit=unit))
+        Ingredient.objects.bulk_update(to_update, ['measurement_unit'])
+        self.updated += len(to_update)
+        Ingredient.objects.bulk_create(to_create, ignore_conflicts=True)
@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from recipes.images import try_make_variants
+from recipes.models import Recipes
+
+
+class Command(BaseCommand):
+    help = ('Готовит уменьшенные копии картинок рецептов, для которых они '
+            'не были созданы, например из-за перезапуска процесса')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age', type=int, default=10,
+            help='Не трогать рецепты, изменённые менее указанного числа '
+                 'минут назад: их копии ещё могут готовиться в пуле потоков'
+        )
+
+    def handle(self, *args, **options):
+        deadline = timezone.now() - timedelta(minutes=options['min_age'])
+        pending = Recipes.objects.filter(
+            image_variants_ready=False, updated_at__lte=deadline
+        ).exclude(image='').values_list('pk', 'image').order_by('pk')
+        failed = 0
+        for recipe_id, name in pending.iterator():
+            if not try_make_variants(recipe_id, name):
+                failed += 1
+                self.stderr.write(f'recipe={recipe_id}: {name}')
+        if failed:
+            raise CommandError(f'Не удалось подготовить картинки: {failed}')
+        self.stdout.write(self.style.SUCCESS('Копии картинок готовы'))
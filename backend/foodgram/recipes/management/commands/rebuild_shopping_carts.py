@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes import shopping_cart
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает сводные списки покупок пользователей'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, action='append', dest='user_ids',
+            help='id пользователя (можно указать несколько раз)'
+        )
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Только сверить сводные списки, ничего не меняя'
+        )
+
+    def handle(self, *args, **options):
+        user_ids = options['user_ids']
+        mismatches = shopping_cart.find_mismatches(user_ids)
+        for (user_id, ingredient_id), (stored, expected) in sorted(
+            mismatches.items()
+        ):
+            self.stdout.write(
+                f'user={user_id} ingredient={ingredient_id}: '
+                f'{stored} != {expected}'
+            )
+        if options['check']:
+            if mismatches:
+                raise CommandError(f'Расхождений: {len(mismatches)}')
+            self.stdout.write(self.style.SUCCESS('Расхождений нет'))
+            return
+        shopping_cart.rebuild(user_ids)
+        self.stdout.write(self.style.SUCCESS(
+            f'Списки покупок пересчитаны, исправлено: {len(mismatches)}'
+        ))
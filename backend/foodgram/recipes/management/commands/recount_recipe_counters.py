@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes import counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики избранного и списков покупок рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipe', type=int, action='append', dest='recipe_ids',
+            help='id рецепта (можно указать несколько раз)'
+        )
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Только сверить счётчики, ничего не меняя'
+        )
+
+    def handle(self, *args, **options):
+        mismatches = counters.find_mismatches(options['recipe_ids'])
+        for pk, favorites, expected_favorites, carts, expected_carts in (
+            mismatches
+        ):
+            self.stdout.write(
+                f'recipe={pk}: избранное {favorites} != '
+                f'{expected_favorites}, покупки {carts} != {expected_carts}'
+            )
+        if options['check']:
+            if mismatches:
+                raise CommandError(f'Расхождений: {len(mismatches)}')
+            self.stdout.write(self.style.SUCCESS('Расхождений нет'))
+            return
+        counters.recount([pk for pk, *_ in mismatches])
+        self.stdout.write(self.style.SUCCESS(
+            f'Счётчики пересчитаны, исправлено: {len(mismatches)}'
+        ))
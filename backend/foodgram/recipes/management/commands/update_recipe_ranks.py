@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from recipes import ranking
+
+
+class Command(BaseCommand):
+    help = ('Обновляет рейтинги рецептов для сортировок popular и trending '
+            'по событиям после последнего расчёта')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Пересчитать рейтинги всех рецептов с нуля'
+        )
+
+    def handle(self, *args, **options):
+        updated = ranking.update_ranks(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлено рейтингов: {updated}'
+        ))
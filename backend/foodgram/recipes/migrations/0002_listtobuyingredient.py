@@ -0,0 +1,74 @@
+# Generated by Django 2.2.19 on 2026-10-17 05:41
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_listtobuy_ingredients(apps, schema_editor):
+    ListToBuy = apps.get_model('recipes', 'ListToBuy')
+    ListToBuyIngredient = apps.get_model('recipes', 'ListToBuyIngredient')
+    totals = ListToBuy.objects.filter(
+        recipe__ingredientrecipe__isnull=False
+    ).values(
+        'user', 'recipe__ingredientrecipe__ingredient'
+    ).annotate(
+        amount_total=models.Sum('recipe__ingredientrecipe__amount')
+    ).order_by()
+    ListToBuyIngredient.objects.bulk_create(
+        ListToBuyIngredient(
+            user_id=row['user'],
+            ingredient_id=row['recipe__ingredientrecipe__ingredient'],
+            amount=row['amount_total']
+        )
+        for row in totals
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='ingredientrecipe',
+            options={'ordering': ('recipe',), 'verbose_name': 'Кол-во ингредиента для рецпта', 'verbose_name_plural': 'Кол-во ингредиента для рецпта'},
+        ),
+        migrations.AlterModelOptions(
+            name='listtobuy',
+            options={'ordering': ('user',), 'verbose_name': 'Список покупок', 'verbose_name_plural': 'Списки покупок'},
+        ),
+        migrations.AlterField(
+            model_name='ingredient',
+            name='measurement_unit',
+            field=models.CharField(max_length=20, verbose_name='Единицы'),
+        ),
+        migrations.AlterField(
+            model_name='ingredient',
+            name='name',
+            field=models.CharField(max_length=256, verbose_name='Название'),
+        ),
+        migrations.CreateModel(
+            name='ListToBuyIngredient',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.PositiveIntegerField(verbose_name='Количество')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='listtobuy_ingredients', to='recipes.Ingredient')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='listtobuy_ingredients', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Ингредиент из списка покупок',
+                'verbose_name_plural': 'Ингредиенты из списков покупок',
+                'ordering': ('user',),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='listtobuyingredient',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='unique_buy_ingredients'),
+        ),
+        migrations.RunPython(
+            fill_listtobuy_ingredients, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 2.2.19 on 2026-10-17 05:44
+
+from django.db import migrations, models
+
+
+def merge_rows(model, field, keep_id, other_ids):
+    for row in model.objects.filter(**{f'{field}_id__in': other_ids}):
+        owner = {
+            name: getattr(row, name) for name in ('recipe_id', 'user_id')
+            if hasattr(row, name)
+        }
+        kept = model.objects.filter(**{f'{field}_id': keep_id}, **owner)
+        if kept.update(amount=models.F('amount') + row.amount):
+            row.delete()
+        else:
+            setattr(row, f'{field}_id', keep_id)
+            row.save()
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    IngredientRecipe = apps.get_model('recipes', 'IngredientRecipe')
+    ListToBuyIngredient = apps.get_model('recipes', 'ListToBuyIngredient')
+    duplicates = Ingredient.objects.values(
+        'name', 'measurement_unit'
+    ).annotate(
+        keep_id=models.Min('pk'), total=models.Count('pk')
+    ).filter(total__gt=1).order_by()
+    for group in duplicates:
+        other_ids = list(Ingredient.objects.filter(
+            name=group['name'], measurement_unit=group['measurement_unit']
+        ).exclude(pk=group['keep_id']).values_list('pk', flat=True))
+        merge_rows(IngredientRecipe, 'ingredient', group['keep_id'], other_ids)
+        merge_rows(
+            ListToBuyIngredient, 'ingredient', group['keep_id'], other_ids
+        )
+        Ingredient.objects.filter(pk__in=other_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_ingredient_search_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop
+        ),
+    ]
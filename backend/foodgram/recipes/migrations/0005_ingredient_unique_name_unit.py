@@ -0,0 +1,19 @@
+# Generated by Django 2.2.19 on 2026-10-17 05:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Отдельно от 0004: в PostgreSQL ALTER TABLE нельзя выполнить в той же
+    # транзакции, где удалялись строки, на которые ссылаются внешние ключи.
+
+    dependencies = [
+        ('recipes', '0004_merge_duplicate_ingredients'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient_unit'),
+        ),
+    ]
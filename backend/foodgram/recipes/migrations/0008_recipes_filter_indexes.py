@@ -0,0 +1,22 @@
+# Generated by Django 2.2.19 on 2026-10-17 05:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipes_pub_date_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipes',
+            index=models.Index(fields=['author', '-pub_date'], name='recipes_author_pub_date_idx'),
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX IF NOT EXISTS recipes_recipes_tags_tag_recipe_idx '
+            'ON recipes_recipes_tags (tag_id, recipes_id)',
+            'DROP INDEX IF EXISTS recipes_recipes_tags_tag_recipe_idx'
+        ),
+    ]
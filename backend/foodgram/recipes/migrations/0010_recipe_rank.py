@@ -0,0 +1,73 @@
+# Generated by Django 2.2.19 on 2026-10-17 05:52
+
+from django.db import migrations, models
+import datetime
+
+import django.db.models.deletion
+
+
+# Строкам, добавленным до этой миграции, дата неизвестна. Им ставится
+# начало отсчёта трендов (recipes.ranking.EPOCH): в popular они
+# учитываются, а их вклад в trending пренебрежимо мал. С датой миграции
+# первый расчёт посчитал бы всю историю свежими событиями.
+BEFORE_RANKING = datetime.datetime(2021, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def create_ranks(apps, schema_editor):
+    Recipes = apps.get_model('recipes', 'Recipes')
+    RecipeRank = apps.get_model('recipes', 'RecipeRank')
+    RecipeRank.objects.bulk_create(
+        (RecipeRank(recipe_id=pk)
+         for pk in Recipes.objects.values_list('pk', flat=True).iterator()),
+        batch_size=5000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_recipes_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeRank',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rank', serialize=False, to='recipes.Recipes')),
+                ('popular', models.FloatField(default=0, verbose_name='Популярность')),
+                ('trending', models.FloatField(default=0, verbose_name='Популярность за последнее время')),
+                ('computed_at', models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Дата расчёта')),
+            ],
+            options={
+                'verbose_name': 'Рейтинг рецепта',
+                'verbose_name_plural': 'Рейтинги рецептов',
+            },
+        ),
+        migrations.AddField(
+            model_name='favorite',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=BEFORE_RANKING, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='listtobuy',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=BEFORE_RANKING, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='subscript',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=BEFORE_RANKING, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='reciperank',
+            index=models.Index(fields=['-popular', '-recipe'], name='recipes_rank_popular_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reciperank',
+            index=models.Index(fields=['-trending', '-recipe'], name='recipes_rank_trending_idx'),
+        ),
+        migrations.RunPython(create_ranks, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 
+from .storage import recipe_image_storage
+
 
 class User(AbstractUser):
     USER = 'user'
@@ -54,22 +56,34 @@ class Ingredient(models.Model):
         ordering = ('name',)
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
+        constraints = [
+            models.UniqueConstraint(fields=['name', 'measurement_unit'],
+                                    name='unique_ingredient_unit')
+        ]
 
     def __str__(self):
         return self.name
 
 
+COUNTER_FIELDS = ('favorites_count', 'in_carts_count')
+
+
 class Recipes(models.Model):
     name = models.CharField('Название', max_length=256)
     text = models.TextField('Описание', null=True, blank=True)
     image = models.ImageField(
         'Картинка',
         upload_to='recipes/',
+        storage=recipe_image_storage,
         blank=True
     )
+    image_variants_ready = models.BooleanField(
+        'Уменьшенные копии картинки готовы', default=False, editable=False
+    )
     pub_date = models.DateTimeField(
         'Дата публикации', auto_now_add=True
     )
+    updated_at = models.DateTimeField('Дата изменения', auto_now=True)
     author = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name='recipes'
     )
@@ -82,15 +96,42 @@ class Recipes(models.Model):
         Ingredient, related_name='ingredients', through='IngredientRecipe'
     )
     cooking_time = models.PositiveIntegerField('Время приготовления')
+    favorites_count = models.PositiveIntegerField(
+        'Кол-во добавлений в избранное', default=0, editable=False
+    )
+    in_carts_count = models.PositiveIntegerField(
+        'Кол-во добавлений в список покупок', default=0, editable=False
+    )
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'],
+                         name='recipes_pub_date_id_idx'),
+            models.Index(fields=['author', '-pub_date'],
+                         name='recipes_author_pub_date_idx'),
+            models.Index(fields=['-favorites_count', '-id'],
+                         name='recipes_favorites_count_idx'),
+            models.Index(fields=['-in_carts_count', '-id'],
+                         name='recipes_in_carts_count_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, force_insert=False, force_update=False, using=None,
+             update_fields=None):
+        # Счётчики меняются только через F() в recipes.counters, поэтому
+        # сохранение загруженного ранее рецепта не должно их перезаписывать.
+        if not self._state.adding and update_fields is None:
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in COUNTER_FIELDS
+            ]
+        super().save(force_insert, force_update, using, update_fields)
+
 
 class IngredientRecipe(models.Model):
     ingredient = models.ForeignKey(
@@ -127,6 +168,9 @@ class Subscript(models.Model):
         on_delete=models.CASCADE,
         related_name='following'
     )
+    created = models.DateTimeField(
+        'Дата добавления', auto_now_add=True, db_index=True
+    )
 
     class Meta:
         ordering = ('user',)
@@ -151,6 +195,9 @@ class Favorite(models.Model):
         Recipes,
         on_delete=models.CASCADE,
         related_name='favorite')
+    created = models.DateTimeField(
+        'Дата добавления', auto_now_add=True, db_index=True
+    )
 
     class Meta:
         ordering = ('user',)
@@ -175,6 +222,9 @@ class ListToBuy(models.Model):
         Recipes,
         on_delete=models.CASCADE,
         related_name='listtobuy')
+    created = models.DateTimeField(
+        'Дата добавления', auto_now_add=True, db_index=True
+    )
 
     class Meta:
         ordering = ('user',)
@@ -187,3 +237,62 @@ class ListToBuy(models.Model):
 
     def __str__(self):
         return f'{self.user} id - {self.user.pk}, {self.recipe}'
+
+
+class ListToBuyIngredient(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='listtobuy_ingredients'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='listtobuy_ingredients'
+    )
+    amount = models.PositiveIntegerField('Количество')
+
+    class Meta:
+        ordering = ('user',)
+        verbose_name = 'Ингредиент из списка покупок'
+        verbose_name_plural = 'Ингредиенты из списков покупок'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'ingredient'],
+                                    name='unique_buy_ingredients')
+        ]
+
+    def __str__(self):
+        return f'{self.user} id - {self.user.pk}, {self.ingredient}'
+
+
+class RecipeRank(models.Model):
+    """Предрасчитанные оценки рецепта для сортировок popular и trending.
+
+    trending хранится как логарифм суммы весов событий с множителем
+    2 ** (t / период полураспада), поэтому при добавлении событий оценку
+    можно обновлять, не пересчитывая её целиком.
+    """
+    recipe = models.OneToOneField(
+        Recipes,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='rank'
+    )
+    popular = models.FloatField('Популярность', default=0)
+    trending = models.FloatField('Популярность за последнее время', default=0)
+    computed_at = models.DateTimeField(
+        'Дата расчёта', null=True, blank=True, db_index=True
+    )
+
+    class Meta:
+        verbose_name = 'Рейтинг рецепта'
+        verbose_name_plural = 'Рейтинги рецептов'
+        indexes = [
+            models.Index(fields=['-popular', '-recipe'],
+                         name='recipes_rank_popular_idx'),
+            models.Index(fields=['-trending', '-recipe'],
+                         name='recipes_rank_trending_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id}: {self.popular:.1f} / {self.trending:.1f}'
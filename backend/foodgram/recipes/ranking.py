@@ -0,0 +1,116 @@
+import math
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Favorite, ListToBuy, RecipeRank, Recipes, Subscript
+
+EPOCH = datetime(2021, 1, 1, tzinfo=timezone.utc)
+TRENDING_HALF_LIFE = timedelta(days=7)
+# Отметка времени события ставится при вставке, а видно оно становится
+# после коммита. Расчёт берёт только события старше этой задержки, чтобы
+# не пропустить те, чья транзакция закоммитилась после начала расчёта.
+EVENT_DELAY = timedelta(minutes=5)
+RECIPE_EVENTS = (
+    (Favorite, 3),
+    (ListToBuy, 2),
+)
+SUBSCRIPTION_WEIGHT = 1
+BATCH_SIZE = 2000
+
+
+def log_weight(weight, moment):
+    return math.log(weight) + math.log(2) * (
+        (moment - EPOCH) / TRENDING_HALF_LIFE
+    )
+
+
+def log_add(first, second):
+    if not first or not second:
+        return first or second
+    high, low = max(first, second), min(first, second)
+    return high + math.log1p(math.exp(low - high))
+
+
+def get_high_water_mark():
+    computed_at = RecipeRank.objects.aggregate(
+        mark=Max('computed_at')
+    )['mark']
+    if computed_at is None:
+        return None
+    return computed_at - EVENT_DELAY
+
+
+def collect_scores(since, until):
+    """Суммирует события (since, until] по рецептам: обычный вес для
+    popular и логарифм затухающего веса для trending.
+    """
+    scores = defaultdict(lambda: [0, 0])
+
+    def add(recipe_id, weight, moment):
+        score = scores[recipe_id]
+        score[0] += weight
+        score[1] = log_add(score[1], log_weight(weight, moment))
+
+    period = {'created__lte': until}
+    if since is not None:
+        period['created__gt'] = since
+    for model, weight in RECIPE_EVENTS:
+        for recipe_id, moment in model.objects.filter(**period).values_list(
+            'recipe_id', 'created'
+        ).order_by().iterator(chunk_size=BATCH_SIZE):
+            add(recipe_id, weight, moment)
+    subscriptions = defaultdict(list)
+    for author_id, moment in Subscript.objects.filter(**period).values_list(
+        'author_id', 'created'
+    ).order_by().iterator(chunk_size=BATCH_SIZE):
+        subscriptions[author_id].append(moment)
+    for author_id, recipe_id in Recipes.objects.filter(
+        author__in=list(subscriptions)
+    ).values_list('author_id', 'pk').order_by().iterator(
+        chunk_size=BATCH_SIZE
+    ):
+        for moment in subscriptions[author_id]:
+            add(recipe_id, SUBSCRIPTION_WEIGHT, moment)
+    return dict(scores)
+
+
+def update_ranks(full=False):
+    """Дописывает в рейтинги события между отметками прошлого и текущего
+    расчётов, сдвинутыми назад на EVENT_DELAY.
+
+    Удалённые из избранного и списков покупок рецепты, а также подписки
+    на автора для его новых рецептов учитываются только при full=True,
+    который пересчитывает рейтинги всех рецептов с нуля.
+    """
+    now = timezone.now()
+    since = None if full else get_high_water_mark()
+    scores = collect_scores(since, now - EVENT_DELAY)
+    with transaction.atomic():
+        RecipeRank.objects.bulk_create(
+            (RecipeRank(recipe_id=pk) for pk in Recipes.objects.filter(
+                rank__isnull=True
+            ).values_list('pk', flat=True)),
+            batch_size=BATCH_SIZE
+        )
+        ranks = RecipeRank.objects.select_for_update()
+        if not full:
+            ranks = ranks.filter(recipe__in=list(scores))
+        changed = []
+        for rank in ranks.order_by('pk').iterator(chunk_size=BATCH_SIZE):
+            popular, trending = scores.get(rank.pk, (0, 0))
+            if full:
+                rank.popular, rank.trending = popular, trending
+            else:
+                rank.popular += popular
+                rank.trending = log_add(rank.trending, trending)
+            rank.computed_at = now
+            changed.append(rank)
+        RecipeRank.objects.bulk_update(
+            changed, ['popular', 'trending', 'computed_at'],
+            batch_size=BATCH_SIZE
+        )
+    return len(changed)
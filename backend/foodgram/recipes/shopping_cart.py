@@ -0,0 +1,138 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Sum
+
+from .locks import lock_users
+from .models import IngredientRecipe, ListToBuy, ListToBuyIngredient
+
+
+def recipe_amounts(recipe_id):
+    return total_amounts([recipe_id])
+
+
+def total_amounts(recipe_ids):
+    amounts = Counter()
+    for ingredient_id, amount in IngredientRecipe.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('ingredient_id', 'amount'):
+        amounts[ingredient_id] += amount
+    return amounts
+
+
+def apply_delta(user_ids, delta):
+    delta = {pk: amount for pk, amount in delta.items() if amount}
+    if not user_ids or not delta:
+        return
+    with transaction.atomic():
+        lock_users(user_ids)
+        rows = {
+            (row.user_id, row.ingredient_id): row
+            for row in ListToBuyIngredient.objects.select_for_update().filter(
+                user_id__in=user_ids, ingredient_id__in=delta
+            )
+        }
+        to_create, to_update, to_delete = [], [], []
+        for user_id in user_ids:
+            for ingredient_id, amount in delta.items():
+                row = rows.get((user_id, ingredient_id))
+                if row is None:
+                    if amount > 0:
+                        to_create.append(ListToBuyIngredient(
+                            user_id=user_id,
+                            ingredient_id=ingredient_id,
+                            amount=amount
+                        ))
+                    continue
+                row.amount += amount
+                if row.amount > 0:
+                    to_update.append(row)
+                else:
+                    to_delete.append(row.pk)
+        ListToBuyIngredient.objects.bulk_create(to_create)
+        ListToBuyIngredient.objects.bulk_update(to_update, ['amount'])
+        ListToBuyIngredient.objects.filter(pk__in=to_delete).delete()
+
+
+def add_recipe(user_id, recipe_id):
+    add_recipes(user_id, [recipe_id])
+
+
+def remove_recipe(user_id, recipe_id):
+    remove_recipes(user_id, [recipe_id])
+
+
+def add_recipes(user_id, recipe_ids):
+    if recipe_ids:
+        apply_delta([user_id], total_amounts(recipe_ids))
+
+
+def remove_recipes(user_id, recipe_ids):
+    if recipe_ids:
+        apply_delta([user_id], {
+            pk: -amount for pk, amount in total_amounts(recipe_ids).items()
+        })
+
+
+def change_recipe(recipe_id, old_amounts, new_amounts):
+    delta = Counter(new_amounts)
+    delta.subtract(old_amounts)
+    user_ids = list(ListToBuy.objects.filter(
+        recipe_id=recipe_id
+    ).values_list('user_id', flat=True))
+    apply_delta(user_ids, delta)
+
+
+def expected_totals(user_ids=None):
+    filters = {'recipe__ingredientrecipe__isnull': False}
+    if user_ids is not None:
+        filters['user__in'] = user_ids
+    return {
+        (user_id, ingredient_id): amount
+        for user_id, ingredient_id, amount in ListToBuy.objects.filter(
+            **filters
+        ).values(
+            'user', 'recipe__ingredientrecipe__ingredient'
+        ).annotate(
+            amount_total=Sum('recipe__ingredientrecipe__amount')
+        ).values_list(
+            'user', 'recipe__ingredientrecipe__ingredient', 'amount_total'
+        ).order_by()
+    }
+
+
+def stored_totals(user_ids=None):
+    queryset = ListToBuyIngredient.objects.all()
+    if user_ids is not None:
+        queryset = queryset.filter(user__in=user_ids)
+    return {
+        (user_id, ingredient_id): amount
+        for user_id, ingredient_id, amount in queryset.values_list(
+            'user', 'ingredient', 'amount'
+        ).order_by()
+    }
+
+
+def find_mismatches(user_ids=None):
+    expected = expected_totals(user_ids)
+    stored = stored_totals(user_ids)
+    return {
+        key: (stored.get(key), expected.get(key))
+        for key in expected.keys() | stored.keys()
+        if stored.get(key) != expected.get(key)
+    }
+
+
+def rebuild(user_ids=None):
+    with transaction.atomic():
+        queryset = ListToBuyIngredient.objects.all()
+        if user_ids is not None:
+            queryset = queryset.filter(user__in=user_ids)
+        queryset.delete()
+        ListToBuyIngredient.objects.bulk_create(
+            ListToBuyIngredient(
+                user_id=user_id, ingredient_id=ingredient_id, amount=amount
+            )
+            for (user_id, ingredient_id), amount
+            in expected_totals(user_ids).items()
+        )
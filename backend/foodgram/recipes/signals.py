@@ -0,0 +1,10 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import RecipeRank, Recipes
+
+
+@receiver(post_save, sender=Recipes)
+def create_recipe_rank(instance, created, raw, **kwargs):
+    if created and not raw:
+        RecipeRank.objects.create(recipe=instance)
@@ -0,0 +1,42 @@
+import hashlib
+import os
+
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Файл называется по sha256 содержимого: <каталог>/<ab>/<sha256>.<ext>.
+
+    Если такой файл уже есть, повторная загрузка ничего не пишет, только
+    обновляет время изменения, чтобы файл не удалила команда
+    collect_orphan_images до коммита рецепта. Файлы могут быть общими
+    для нескольких рецептов, поэтому удаляются только этой командой.
+    """
+
+    def content_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        digest = digest.hexdigest()
+        return os.path.join(
+            os.path.dirname(name),
+            digest[:2],
+            digest + os.path.splitext(name)[1].lower()
+        )
+
+    def _save(self, name, content):
+        name = self.content_name(name, content)
+        if self.exists(name):
+            os.utime(self.path(name))
+            return name
+        return super()._save(name, content)
+
+    def save_derived(self, name, content):
+        if self.exists(name):
+            os.utime(self.path(name))
+            return name
+        return super()._save(name, content)
+
+
+recipe_image_storage = ContentAddressedStorage()
@@ -0,0 +1,26 @@
+import time
+
+from django.core.cache import cache
+
+
+def table_version_key(model):
+    return f'table-version:{model._meta.label_lower}'
+
+
+def initial_version():
+    # Если кэш потерял счётчик, он начинается заново с текущего времени
+    # в миллисекундах, чтобы не повторить версии, выданные до этого.
+    return int(time.time() * 1000)
+
+
+def get_table_version(model):
+    return cache.get_or_set(table_version_key(model), initial_version, None)
+
+
+def bump_table_version(model):
+    key = table_version_key(model)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, initial_version(), None)
+        return cache.incr(key)
@@ -0,0 +1,33 @@
+from django.test import TestCase
+
+from recipes import counters
+from recipes.models import Recipes, User
+
+
+class RecipeSaveTest(TestCase):
+    def setUp(self):
+        author = User.objects.create(
+            username='author', email='author@example.com'
+        )
+        self.recipe = Recipes.objects.create(
+            author=author, name='Хлеб', text='Описание', cooking_time=10
+        )
+
+    def test_save_keeps_counters_changed_with_f(self):
+        stale = Recipes.objects.get(pk=self.recipe.pk)
+        counters.change(self.recipe.pk, 'favorites_count', 1)
+        counters.change(self.recipe.pk, 'in_carts_count', 2)
+        stale.name = 'Батон'
+        stale.save()
+        recipe = Recipes.objects.get(pk=self.recipe.pk)
+        self.assertEqual(recipe.name, 'Батон')
+        self.assertEqual(
+            (recipe.favorites_count, recipe.in_carts_count), (1, 2)
+        )
+
+    def test_save_respects_update_fields(self):
+        self.recipe.name = 'Батон'
+        self.recipe.cooking_time = 20
+        self.recipe.save(update_fields=['cooking_time'])
+        recipe = Recipes.objects.get(pk=self.recipe.pk)
+        self.assertEqual((recipe.name, recipe.cooking_time), ('Хлеб', 20))
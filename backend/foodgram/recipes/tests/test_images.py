@@ -0,0 +1,60 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from recipes import images
+from recipes.models import Recipes, User
+
+MAKE_VARIANTS = 'recipes.images.make_variants'
+
+
+class ImageVariantsTest(TestCase):
+    def setUp(self):
+        author = User.objects.create(
+            username='author', email='author@example.com'
+        )
+        self.recipe = Recipes.objects.create(
+            author=author, name='Хлеб', text='Описание', cooking_time=10,
+            image='recipes/bread.jpg'
+        )
+
+    def make_stale(self, **fields):
+        Recipes.objects.filter(pk=self.recipe.pk).update(
+            updated_at=timezone.now() - timedelta(hours=1), **fields
+        )
+
+    def test_failure_is_logged(self):
+        with mock.patch(MAKE_VARIANTS, side_effect=OSError):
+            with self.assertLogs(images.logger, 'ERROR'):
+                made = images.try_make_variants(
+                    self.recipe.pk, 'recipes/bread.jpg'
+                )
+        self.assertFalse(made)
+
+    def test_command_repairs_missing_variants(self):
+        self.make_stale()
+        with mock.patch(MAKE_VARIANTS) as make_variants:
+            call_command('make_image_variants', stdout=mock.Mock())
+        make_variants.assert_called_once_with(
+            self.recipe.pk, 'recipes/bread.jpg'
+        )
+
+    def test_command_skips_ready_and_recent_recipes(self):
+        with mock.patch(MAKE_VARIANTS) as make_variants:
+            call_command('make_image_variants', stdout=mock.Mock())
+            self.make_stale(image_variants_ready=True)
+            call_command('make_image_variants', stdout=mock.Mock())
+        make_variants.assert_not_called()
+
+    def test_command_reports_failures(self):
+        self.make_stale()
+        with mock.patch(MAKE_VARIANTS, side_effect=OSError):
+            with self.assertLogs(images.logger, 'ERROR'):
+                with self.assertRaises(CommandError):
+                    call_command(
+                        'make_image_variants',
+                        stdout=mock.Mock(), stderr=mock.Mock()
+                    )
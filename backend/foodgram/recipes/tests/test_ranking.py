@@ -0,0 +1,46 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from recipes import ranking
+from recipes.models import Favorite, RecipeRank, Recipes, User
+
+
+class UpdateRanksTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(
+            username='reader', email='reader@example.com'
+        )
+        self.recipe = Recipes.objects.create(
+            author=self.user, name='Хлеб', text='Описание', cooking_time=10
+        )
+        self.start = timezone.now()
+
+    def add_favorite(self, created):
+        favorite = Favorite.objects.create(user=self.user, recipe=self.recipe)
+        Favorite.objects.filter(pk=favorite.pk).update(created=created)
+
+    def update_ranks(self, moment, full=False):
+        with mock.patch.object(ranking.timezone, 'now', return_value=moment):
+            ranking.update_ranks(full=full)
+        return RecipeRank.objects.get(recipe=self.recipe).popular
+
+    def test_recipe_gets_rank_on_create(self):
+        self.assertTrue(RecipeRank.objects.filter(recipe=self.recipe).exists())
+
+    def test_recent_events_wait_for_delay(self):
+        self.add_favorite(self.start)
+        self.assertEqual(self.update_ranks(self.start), 0)
+        moment = self.start + ranking.EVENT_DELAY + timedelta(seconds=1)
+        self.assertEqual(self.update_ranks(moment), 3)
+        self.assertEqual(self.update_ranks(moment + timedelta(minutes=1)), 3)
+
+    def test_event_committed_after_update_is_counted(self):
+        self.update_ranks(self.start, full=True)
+        # Событие вставлено до расчёта, а закоммичено после него.
+        self.add_favorite(self.start - timedelta(seconds=1))
+        moment = self.start + ranking.EVENT_DELAY
+        self.assertEqual(self.update_ranks(moment), 3)
+        self.assertEqual(self.update_ranks(moment, full=True), 3)
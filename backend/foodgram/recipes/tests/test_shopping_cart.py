@@ -0,0 +1,88 @@
+import threading
+import time
+
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+
+from recipes import shopping_cart
+from recipes.models import (
+    Ingredient, IngredientRecipe, ListToBuy, ListToBuyIngredient, Recipes,
+    User
+)
+
+
+def create_recipe(author, name, ingredients):
+    recipe = Recipes.objects.create(
+        author=author, name=name, text='Описание', cooking_time=10
+    )
+    IngredientRecipe.objects.bulk_create(
+        IngredientRecipe(recipe=recipe, ingredient=ingredient, amount=amount)
+        for ingredient, amount in ingredients.items()
+    )
+    return recipe
+
+
+class ShoppingCartFixture:
+    def create_data(self):
+        self.user = User.objects.create(
+            username='buyer', email='buyer@example.com'
+        )
+        self.flour = Ingredient.objects.create(
+            name='Мука', measurement_unit='г'
+        )
+        self.salt = Ingredient.objects.create(
+            name='Соль', measurement_unit='г'
+        )
+        self.bread = create_recipe(
+            self.user, 'Хлеб', {self.flour: 500, self.salt: 10}
+        )
+        self.pancakes = create_recipe(self.user, 'Блины', {self.flour: 200})
+
+    def amounts(self):
+        return dict(ListToBuyIngredient.objects.filter(
+            user=self.user
+        ).values_list('ingredient__name', 'amount'))
+
+
+class ApplyDeltaTest(ShoppingCartFixture, TestCase):
+    def setUp(self):
+        self.create_data()
+
+    def test_overlapping_recipes(self):
+        for recipe in (self.bread, self.pancakes):
+            ListToBuy.objects.create(user=self.user, recipe=recipe)
+            shopping_cart.add_recipe(self.user.pk, recipe.pk)
+        self.assertEqual(self.amounts(), {'Мука': 700, 'Соль': 10})
+        ListToBuy.objects.filter(recipe=self.bread).delete()
+        shopping_cart.remove_recipe(self.user.pk, self.bread.pk)
+        self.assertEqual(self.amounts(), {'Мука': 200})
+        self.assertEqual(shopping_cart.find_mismatches(), {})
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class ConcurrentApplyDeltaTest(ShoppingCartFixture, TransactionTestCase):
+    def setUp(self):
+        self.create_data()
+
+    def add_in_thread(self, recipe, errors):
+        try:
+            shopping_cart.add_recipe(self.user.pk, recipe.pk)
+        except Exception as error:
+            errors.append(error)
+        finally:
+            connection.close()
+
+    def test_concurrent_adds_of_a_shared_ingredient(self):
+        errors = []
+        with transaction.atomic():
+            shopping_cart.add_recipe(self.user.pk, self.bread.pk)
+            thread = threading.Thread(
+                target=self.add_in_thread, args=(self.pancakes, errors)
+            )
+            thread.start()
+            # Второй поток доходит до корзины, пока первая транзакция
+            # ещё не закоммичена.
+            time.sleep(0.5)
+        thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(self.amounts(), {'Мука': 700, 'Соль': 10})
@@ -1,16 +1,22 @@
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import BooleanField, Count, F, Value, Window
+from django.db.models.functions import RowNumber
 from django.shortcuts import get_object_or_404
 from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 
-from recipes.models import User, Subscript
+from recipes.models import User, Subscript, Recipes
 from api.serializers import (
     CustomUserSerializer,
     SetPasswordSerializer,
     SubscriptSerializer,
     SubscriptCreateSerializer,
 )
+from api.exceptions import toggle_error
 from api.mixins import ListRetrieveCreateViewSet
 from api.pagination import CustomPagination
 
@@ -41,13 +47,45 @@ class CustomUserViewSet(ListRetrieveCreateViewSet):
         self.request.user.save()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    def get_recipes_limit(self):
+        recipes_limit = self.request.query_params.get('recipes_limit')
+        if recipes_limit is None or not recipes_limit.isdigit():
+            return None
+        return int(recipes_limit)
+
+    def attach_recipes(self, authors, recipes_limit):
+        if not authors:
+            return
+        recipes = Recipes.objects.filter(author__in=authors)
+        if recipes_limit is not None:
+            window = recipes.annotate(row_number=Window(
+                expression=RowNumber(),
+                partition_by=[F('author')],
+                order_by=[F('pub_date').desc(), F('id').desc()]
+            )).order_by()
+            sql, params = window.query.sql_with_params()
+            recipes = Recipes.objects.raw(
+                f'SELECT * FROM ({sql}) AS windowed '
+                f'WHERE row_number <= %s ORDER BY author_id, row_number',
+                (*params, recipes_limit)
+            )
+        author_recipes = defaultdict(list)
+        for recipe in recipes:
+            author_recipes[recipe.author_id].append(recipe)
+        for author in authors:
+            author.page_recipes = author_recipes[author.pk]
+
     @action(detail=False, permission_classes=(IsAuthenticated,))
     def subscriptions(self, request):
         queryset = User.objects.filter(
-            id__in=request.user.follower.values_list('author', flat=True)
+            following__user=request.user
+        ).annotate(
+            recipes_count=Count('recipes'),
+            is_subscribed=Value(True, output_field=BooleanField())
         ).order_by('pk')
-        recipes_limit = self.request.query_params.get('recipes_limit')
+        recipes_limit = self.get_recipes_limit()
         page = self.paginate_queryset(queryset)
+        self.attach_recipes(page, recipes_limit)
         serializer = SubscriptSerializer(
             page,
             many=True,
@@ -61,17 +99,26 @@ class CustomUserViewSet(ListRetrieveCreateViewSet):
         permission_classes=(IsAuthenticated,)
     )
     def subscribe(self, request, pk):
-        data = {}
-        data['author'] = get_object_or_404(User, pk=pk).pk
-        data['user'] = self.request.user.pk
-        serializer = SubscriptCreateSerializer(
-            context={'request': request}, data=data
-        )
-        serializer.is_valid(raise_exception=True)
+        author = get_object_or_404(User, pk=pk)
         if request.method == "POST":
-            serializer.save()
+            if author == request.user:
+                raise toggle_error(SubscriptCreateSerializer.self_message)
+            try:
+                with transaction.atomic():
+                    instance = Subscript.objects.create(
+                        user=request.user, author=author
+                    )
+            except IntegrityError:
+                raise toggle_error(SubscriptCreateSerializer.exists_message)
             return Response(
-                serializer.data, status=status.HTTP_201_CREATED
+                SubscriptCreateSerializer(
+                    instance, context={'request': request}
+                ).data,
+                status=status.HTTP_201_CREATED
             )
-        Subscript.objects.filter(**data).delete()
+        deleted, _ = Subscript.objects.filter(
+            user=request.user, author=author
+        ).delete()
+        if not deleted:
+            raise toggle_error(SubscriptCreateSerializer.missing_message)
         return Response(status=status.HTTP_204_NO_CONTENT)